@@ -0,0 +1,40 @@
+"""Add indexes for filters and joins
+
+Revision ID: 5c1f2a7d9e34
+Revises: ba206a9d58cd
+Create Date: 2026-10-18 10:12:44.201337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '5c1f2a7d9e34'
+down_revision = 'ba206a9d58cd'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_organizations_phone', 'organizations', ['phone']),
+    ('ix_organizations_registrator_id', 'organizations', ['registrator_id']),
+    ('ix_organizations_plan', 'organizations', ['plan']),
+    ('ix_payments_organization_id_payment_date', 'payments', ['organization_id', 'payment_date']),
+    ('ix_payments_payment_date_id', 'payments', ['payment_date', 'id']),
+    ('ix_payments_source', 'payments', ['source']),
+    ('ix_user_payouts_user_id_payout_date', 'user_payouts', ['user_id', 'payout_date']),
+    ('ix_branches_organization_id', 'branches', ['organization_id']),
+    ('ix_devices_branch_id', 'devices', ['branch_id']),
+    ('ix_add_ons_organization_id', 'add_ons', ['organization_id']),
+]
+
+def upgrade() -> None:
+    # CONCURRENTLY keeps payments writable while the indexes build; it cannot
+    # run inside a transaction block.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,34 @@
+"""Add trigram search indexes
+
+Revision ID: 8e4b0d6a2f17
+Revises: 5c1f2a7d9e34
+Create Date: 2026-10-18 11:03:27.518904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '8e4b0d6a2f17'
+down_revision = '5c1f2a7d9e34'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_organizations_name_trgm', 'organizations', 'lower(name) gin_trgm_ops'),
+    ('ix_organizations_phone_trgm', 'organizations', 'phone gin_trgm_ops'),
+    ('ix_users_full_name_trgm', 'users', 'lower(full_name) gin_trgm_ops'),
+    ('ix_users_phone_trgm', 'users', 'phone gin_trgm_ops'),
+]
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for name, table, expression in INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} USING gin ({expression})")
+
+def downgrade() -> None:
+    # pg_trgm is left installed; other objects may depend on it
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,42 @@
+"""Add user_balances ledger
+
+Revision ID: a3d7e91c0b58
+Revises: 8e4b0d6a2f17
+Create Date: 2026-10-18 12:26:09.734512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a3d7e91c0b58'
+down_revision = '8e4b0d6a2f17'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table('user_balances',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total_earnings', sa.Numeric(precision=14, scale=2), server_default='0', nullable=False),
+    sa.Column('total_payouts', sa.Numeric(precision=14, scale=2), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # Backfill from the raw tables; `python -m app.db.balances verify` checks it later
+    op.execute("""
+        INSERT INTO user_balances (user_id, total_earnings, total_payouts)
+        SELECT u.id, COALESCE(e.total, 0), COALESCE(p.total, 0)
+        FROM users u
+        LEFT JOIN (
+            SELECT o.registrator_id AS user_id, SUM(pay.amount) AS total
+            FROM organizations o JOIN payments pay ON pay.organization_id = o.id
+            GROUP BY o.registrator_id
+        ) e ON e.user_id = u.id
+        LEFT JOIN (
+            SELECT user_id, SUM(amount) AS total FROM user_payouts GROUP BY user_id
+        ) p ON p.user_id = u.id
+    """)
+
+def downgrade() -> None:
+    op.drop_table('user_balances')
@@ -0,0 +1,39 @@
+"""Add payment_daily_totals rollup
+
+Revision ID: c6f2b8e40d93
+Revises: a3d7e91c0b58
+Create Date: 2026-10-18 13:41:52.160478
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c6f2b8e40d93'
+down_revision = 'a3d7e91c0b58'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table('payment_daily_totals',
+    sa.Column('organization_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('source', sa.String(length=50), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=14, scale=2), server_default='0', nullable=False),
+    sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('organization_id', 'day', 'source')
+    )
+    op.create_index('ix_payment_daily_totals_day', 'payment_daily_totals', ['day'], unique=False)
+    op.execute("""
+        INSERT INTO payment_daily_totals (organization_id, day, source, amount, count)
+        SELECT organization_id, payment_date, source, SUM(amount), COUNT(*)
+        FROM payments
+        WHERE organization_id IS NOT NULL
+        GROUP BY organization_id, payment_date, source
+    """)
+
+def downgrade() -> None:
+    op.drop_index('ix_payment_daily_totals_day', table_name='payment_daily_totals')
+    op.drop_table('payment_daily_totals')
@@ -0,0 +1,25 @@
+"""Add catalog_versions
+
+Revision ID: d81a4c27f6e0
+Revises: c6f2b8e40d93
+Create Date: 2026-10-18 14:58:13.902771
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd81a4c27f6e0'
+down_revision = 'c6f2b8e40d93'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table('catalog_versions',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.BigInteger(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+def downgrade() -> None:
+    op.drop_table('catalog_versions')
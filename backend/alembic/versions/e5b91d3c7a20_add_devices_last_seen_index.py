@@ -0,0 +1,27 @@
+"""Add devices branch_id/last_seen index
+
+Revision ID: e5b91d3c7a20
+Revises: d81a4c27f6e0
+Create Date: 2026-10-18 19:05:37.418263
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e5b91d3c7a20'
+down_revision = 'd81a4c27f6e0'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # CONCURRENTLY keeps devices writable (heartbeat flushes) while the index builds.
+    # The composite index covers branch_id lookups, so the single-column one goes.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_devices_branch_id_last_seen', 'devices', ['branch_id', 'last_seen'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_devices_branch_id', table_name='devices', postgresql_concurrently=True, if_exists=True)
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_devices_branch_id', 'devices', ['branch_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_devices_branch_id_last_seen', table_name='devices', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,28 @@
+from fastapi import APIRouter
+from app.api.routers.auth import router as auth_router
+from app.api.routers.admin import router as admin_router
+from app.api.routers.imports import router as imports_router
+from .users import router as users_router
+from .organizations import router as orgs_router
+from .payments import router as payments_router
+from .user_payouts import router as payouts_router
+from .plans import router as plans_router
+from .registration_requests import router as regreq_router
+from app.api.shared.organizations import router as shared_orgs_router
+from app.api.shared.plans import router as shared_plans_router
+
+# Mirrors app.api.routers.api_router with AsyncSession-backed endpoints. Auth,
+# admin and bulk import stay on the sync routers; the endpoints that need no
+# database come from app.api.shared and are the same in both.
+api_router = APIRouter()
+api_router.include_router(auth_router, prefix="/auth", tags=["Auth"])
+api_router.include_router(users_router, prefix="/users", tags=["Users"])
+api_router.include_router(orgs_router, prefix="/organizations", tags=["Organizations"])
+api_router.include_router(shared_orgs_router, prefix="/organizations", tags=["Organizations"])
+api_router.include_router(payments_router, prefix="/payments", tags=["Payments"])
+api_router.include_router(payouts_router, prefix="/user-payouts", tags=["User Payouts"])
+api_router.include_router(plans_router, prefix="/plans", tags=["Plans"])
+api_router.include_router(shared_plans_router, prefix="/plans", tags=["Plans"])
+api_router.include_router(regreq_router, prefix="/registration-requests", tags=["Registration Requests"])
+api_router.include_router(admin_router, prefix="/admin", tags=["Admin"])
+api_router.include_router(imports_router, prefix="/import", tags=["Import"])
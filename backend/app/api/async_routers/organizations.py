@@ -0,0 +1,229 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models.organization import Organization
+from app.db.models.branch import Branch
+from app.db.models.device import Device
+from app.db.models.add_on import AddOn
+from app.db import rollups
+from app.schemas.organization import (
+    OrganizationCreate,
+    OrganizationUpdate,
+    OrganizationOut,
+    OrganizationListResponse,
+    BranchCreate,
+    BranchOut,
+    DeviceCreate,
+    DeviceOut,
+    StaleDeviceOut,
+    AddOnCreate,
+    AddOnOut,
+    LoginResponse,
+    LoginRequest,
+)
+from app.api.deps import get_async_db, require_roles
+from app.api.responses import PydanticJSONResponse, validate_rows
+from app.api.pagination import PageParams
+from app.api.export import stream_rows_async
+from app.api.etag import check_etag
+from app.api.shared import pop_password, require_absent, require_found
+from app.api.shared import organizations as shared
+from app.core.password_hasher import password_hasher
+
+# Routes are declared in the same order as app.api.routers.organizations.
+router = APIRouter()
+
+@router.get("", response_model=OrganizationListResponse)
+async def list_organizations(
+    search: Optional[str] = None,
+    plan: Optional[str] = None,
+    rank: bool = False,
+    params: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    _: dict = Depends(require_roles("admin", "moderator", "registrator")),
+):
+    page = shared.list_page(search, plan, rank, params)
+    total = await db.scalar(page.count) if page.count is not None else None
+    return page.response((await db.scalars(page.rows)).all(), total)
+
+@router.get("/export")
+async def export_organizations(
+    search: Optional[str] = None,
+    plan: Optional[str] = None,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    _: dict = Depends(require_roles("admin", "moderator", "registrator")),
+):
+    return shared.export(search, plan, format, gzip, stream_rows_async)
+
+@router.post("", response_model=OrganizationOut, status_code=201)
+async def create_organization(payload: OrganizationCreate, db: AsyncSession = Depends(get_async_db), _: dict = Depends(require_roles("admin", "moderator"))):
+    require_absent(await db.scalar(shared.phone_taken(payload.phone)), "Organization with this phone number already exists")
+    org = shared.new_organization(payload, await password_hasher.hash_async(payload.password))
+    db.add(org)
+    await db.commit()
+    return OrganizationOut.model_validate(await db.scalar(shared.by_id(org.id)))
+
+@router.get("/{org_id}", response_model=OrganizationOut)
+async def get_organization(
+    org_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    payload: dict = Depends(require_roles("admin", "moderator", "registrator", "organization")),
+):
+    org = shared.found(await db.scalar(shared.by_id(org_id)))
+    if shared.is_registrator(payload):
+        shared.check_registrator(org, payload)
+    not_modified = check_etag(request, response, shared.organization_etag(org, payload))
+    if not_modified:
+        return not_modified
+    return shared.organization_out(org, payload)
+
+
+@router.get("/phone/{phone}", response_model=OrganizationOut)
+async def get_organization_by_phone_number(
+    phone: str,
+    db: AsyncSession = Depends(get_async_db),
+    payload: dict = Depends(require_roles("admin", "moderator", "registrator", "organization")),
+):
+    org = shared.found(await db.scalar(shared.by_phone(phone)))
+    if shared.is_registrator(payload):
+        shared.check_registrator(org, payload)
+    return shared.organization_out(org, payload)
+
+@router.put("/{org_id}", response_model=OrganizationOut)
+async def update_organization(org_id: int, payload: OrganizationUpdate, db: AsyncSession = Depends(get_async_db), _: dict = Depends(require_roles("admin", "moderator", "organization"))):
+    update_data = payload.model_dump(exclude_unset=True)
+    password = pop_password(update_data)
+    password_hash = await password_hasher.hash_async(password) if password else None
+    org = shared.found(await db.get(Organization, org_id, with_for_update=True))
+    statements, regroups_revenue = shared.apply_update(org, update_data, password_hash)
+    for statement in statements:
+        await db.execute(statement)
+    await db.commit()
+    if regroups_revenue:
+        rollups.revenue_cache.clear()
+    return OrganizationOut.model_validate(await db.scalar(shared.by_id(org_id)))
+
+@router.delete("/{org_id}", status_code=204)
+async def delete_organization(org_id: int, db: AsyncSession = Depends(get_async_db), _: dict = Depends(require_roles("admin"))):
+    org = shared.found(await db.get(Organization, org_id, with_for_update=True))
+    for statement in shared.delete_statements(org):
+        await db.execute(statement)
+    await db.delete(org)
+    await db.commit()
+    rollups.revenue_cache.clear()
+    return
+
+@router.post("/login", response_model=LoginResponse)
+async def login(payload: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    org = await db.scalar(shared.by_phone(payload.phone))
+    valid, new_hash = await password_hasher.verify_async(payload.password, org.password_hash) if org else (False, None)
+    if new_hash:
+        org.password_hash = new_hash
+        await db.commit()
+    return shared.login_response(org, valid)
+
+@router.get("/{org_id}/branches", response_model=list[BranchOut])
+async def list_branches(
+    org_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    payload: dict = Depends(require_roles("admin", "moderator", "registrator", "organization")),
+):
+    if shared.is_registrator(payload):
+        shared.check_registrator(await db.get(Organization, org_id), payload)
+    return shared.cached_list(request, response, "branches", org_id, (await db.scalars(shared.branches(org_id))).all(), BranchOut)
+
+@router.post("/{org_id}/branches", response_model=BranchOut, status_code=201)
+async def create_branch(org_id: int, payload: BranchCreate, db: AsyncSession = Depends(get_async_db), _: dict = Depends(require_roles("admin", "moderator", "organization"))):
+    shared.found(await db.get(Organization, org_id))
+    require_absent(await db.scalar(shared.branch_exists(org_id, payload)), "Branch with this name and location already exists in this organization")
+    branch = Branch(organization_id=org_id, **payload.model_dump())
+    db.add(branch)
+    await db.commit()
+    await db.refresh(branch)
+    return BranchOut.model_validate(branch)
+
+@router.get("/{org_id}/devices", response_model=list[DeviceOut])
+async def list_devices(
+    org_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    payload: dict = Depends(require_roles("admin", "moderator", "registrator", "organization")),
+    ):
+    if shared.is_registrator(payload):
+        shared.check_registrator(await db.get(Organization, org_id), payload)
+    return shared.cached_list(request, response, "devices", org_id, (await db.scalars(shared.devices(org_id))).all(), DeviceOut)
+
+@router.post("/{org_id}/devices", response_model=DeviceOut, status_code=201)
+async def create_device(org_id: int, payload: DeviceCreate, db: AsyncSession = Depends(get_async_db), _: dict = Depends(require_roles("admin", "moderator", "organization"))):
+    shared.check_branch(await db.get(Branch, payload.branch_id), org_id)
+    require_absent(await db.scalar(shared.device_exists(payload)), "Device with this name and OS already exists in this branch")
+    device = shared.new_device(payload)
+    db.add(device)
+    await db.commit()
+    await db.refresh(device)
+    return DeviceOut.model_validate(device)
+
+@router.get("/{org_id}/devices/stale", response_model=list[StaleDeviceOut])
+async def list_stale_devices(
+    org_id: int,
+    hours: int = Query(24, ge=1),
+    page: int = Query(1, ge=1),
+    size: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+    payload: dict = Depends(require_roles("admin", "moderator", "registrator", "organization")),
+):
+    shared.check_own_organization(org_id, payload)
+    if shared.is_registrator(payload):
+        shared.check_registrator(await db.get(Organization, org_id), payload)
+    devices = (await db.scalars(shared.stale_devices(org_id, hours, page, size))).all()
+    return PydanticJSONResponse(validate_rows(StaleDeviceOut, devices))
+
+@router.put("/{org_id}/devices/{device_id}", response_model=DeviceOut)
+async def update_device(org_id: int, device_id: str, payload: DeviceCreate, db: AsyncSession = Depends(get_async_db), _: dict = Depends(require_roles("admin", "moderator", "organization"))):
+    device = require_found(await db.get(Device, device_id), "Device not found")
+    shared.check_branch(await db.get(Branch, payload.branch_id), org_id)
+    shared.update_device(device, payload)
+    await db.commit()
+    await db.refresh(device)
+    return DeviceOut.model_validate(device)
+
+@router.delete("/{org_id}/devices/{device_id}", status_code=204)
+async def delete_device(org_id: int, device_id: str, db: AsyncSession = Depends(get_async_db), _: dict = Depends(require_roles("admin", "moderator", "organization"))):
+    device = require_found(await db.get(Device, device_id), "Device not found")
+    shared.check_branch(await db.get(Branch, device.branch_id), org_id, "Invalid organization")
+    await db.delete(device)
+    await db.commit()
+    return
+
+@router.get("/{org_id}/add-ons", response_model=list[AddOnOut])
+async def list_addons(
+    org_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    payload: dict = Depends(require_roles("admin", "moderator", "registrator", "organization")),
+    ):
+    if shared.is_registrator(payload):
+        shared.check_registrator(await db.get(Organization, org_id), payload)
+    return shared.cached_list(request, response, "add-ons", org_id, (await db.scalars(shared.addons(org_id))).all(), AddOnOut)
+
+@router.post("/{org_id}/add-ons", response_model=AddOnOut, status_code=201)
+async def create_addon(org_id: int, payload: AddOnCreate, db: AsyncSession = Depends(get_async_db), _: dict = Depends(require_roles("admin", "moderator", "organization"))):
+    addon = shared.new_addon(org_id, payload)
+    db.add(addon)
+    await db.commit()
+    await db.refresh(addon)
+    return AddOnOut.model_validate(addon)
+
+@router.delete("/{org_id}/add-ons/{addon_id}", status_code=204)
+async def delete_addon(org_id: int, addon_id: str, db: AsyncSession = Depends(get_async_db), _: dict = Depends(require_roles("admin", "moderator", "organization"))):
+    addon = shared.found_addon(await db.get(AddOn, addon_id), org_id)
+    await db.delete(addon)
+    await db.commit()
+    return
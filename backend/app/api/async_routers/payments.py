@@ -0,0 +1,73 @@
+from typing import Optional
+from datetime import date
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import rollups
+from app.schemas.payment import PaymentCreate, PaymentOut, PaymentListResponse, SverkaResponse, RevenueAnalyticsResponse
+from app.api.deps import get_async_db, require_roles
+from app.api.pagination import PageParams
+from app.api.export import stream_rows_async
+from app.api.shared import payments as shared
+
+router = APIRouter()
+
+@router.get("", response_model=PaymentListResponse)
+async def list_payments(
+    organization_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    source: Optional[str] = None,
+    params: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    _: dict = Depends(require_roles("admin", "moderator")),
+):
+    page = shared.list_page(organization_id, start_date, end_date, source, params)
+    total = await db.scalar(page.count) if page.count is not None else None
+    return page.response((await db.scalars(page.rows)).all(), total)
+
+@router.get("/export")
+async def export_payments(
+    organization_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    source: Optional[str] = None,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    _: dict = Depends(require_roles("admin", "moderator")),
+):
+    return shared.export(organization_id, start_date, end_date, source, format, gzip, stream_rows_async)
+
+@router.post("", response_model=PaymentOut, status_code=201)
+async def create_payment(payload: PaymentCreate, db: AsyncSession = Depends(get_async_db), _: dict = Depends(require_roles("admin", "moderator"))):
+    payment, statements = shared.new_payment(payload)
+    db.add(payment)
+    for statement in statements:
+        await db.execute(statement)
+    await db.commit()
+    rollups.revenue_cache.clear()
+    await db.refresh(payment)
+    return PaymentOut.model_validate(payment)
+
+@router.get("/sverka/{organization_id}", response_model=SverkaResponse)
+async def sverka(organization_id: int, start_date: date, end_date: date, db: AsyncSession = Depends(get_async_db), _: dict = Depends(require_roles("admin", "moderator"))):
+    total = await db.scalar(rollups.revenue_total(start_date, end_date, organization_id))
+    return SverkaResponse(organization_id=organization_id, start_date=start_date, end_date=end_date, total_amount=float(total))
+
+@router.get("/analytics", response_model=RevenueAnalyticsResponse)
+async def revenue_analytics(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    organization_id: Optional[int] = None,
+    source: Optional[str] = None,
+    plan: Optional[str] = None,
+    registrator_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+    _: dict = Depends(require_roles("admin", "moderator")),
+):
+    filters = (start_date, end_date, organization_id, source, plan, registrator_id)
+    key = shared.analytics_key(filters)
+    cached = rollups.revenue_cache.get(key)
+    if cached is not None:
+        return cached
+    rows = (await db.execute(rollups.revenue_breakdown_statement(*filters))).all()
+    return shared.analytics_response(key, start_date, end_date, rows)
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models.plan import CustomPlan
+from app.schemas.plan import PlanCreate, PlanUpdate, PlanOut
+from app.api.deps import get_async_db, require_roles
+from app.core.plan_catalog import plan_catalog, bump_version_statement
+from app.api.shared import plans as shared
+
+router = APIRouter()
+
+@router.post("", response_model=PlanOut, status_code=201)
+async def create_plan(payload: PlanCreate, db: AsyncSession = Depends(get_async_db), _: dict = Depends(require_roles("admin"))):
+    plan = shared.new_plan(payload)
+    db.add(plan)
+    await db.execute(bump_version_statement())
+    await db.commit()
+    await db.refresh(plan)
+    await plan_catalog.load_async(db)
+    return PlanOut.model_validate(plan)
+
+@router.put("/{plan_id}", response_model=PlanOut)
+async def update_plan(plan_id: int, payload: PlanUpdate, db: AsyncSession = Depends(get_async_db), _: dict = Depends(require_roles("admin"))):
+    plan = shared.found(await db.get(CustomPlan, plan_id))
+    shared.apply_update(plan, payload)
+    await db.execute(bump_version_statement())
+    await db.commit()
+    await db.refresh(plan)
+    await plan_catalog.load_async(db)
+    return PlanOut.model_validate(plan)
+
+@router.delete("/{plan_id}", status_code=204)
+async def delete_plan(plan_id: int, db: AsyncSession = Depends(get_async_db), _: dict = Depends(require_roles("admin"))):
+    plan = shared.found(await db.get(CustomPlan, plan_id))
+    await db.delete(plan)
+    await db.execute(bump_version_statement())
+    await db.commit()
+    await plan_catalog.load_async(db)
+    return
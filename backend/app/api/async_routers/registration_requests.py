@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models.registration_request import RegistrationRequest
+from app.schemas.registration_request import RegistrationApprovePayload
+from app.core.password_hasher import password_hasher
+from app.api.deps import get_async_db, require_roles
+from app.api.shared import registration_requests as shared
+
+router = APIRouter()
+
+@router.get("", response_model=list[dict])
+async def list_requests(db: AsyncSession = Depends(get_async_db), _: dict = Depends(require_roles("admin", "moderator"))):
+    return [shared.request_item(r) for r in (await db.scalars(shared.list_statement())).all()]
+
+@router.post("/{req_id}/approve")
+async def approve(req_id: int, payload: RegistrationApprovePayload, db: AsyncSession = Depends(get_async_db), _: dict = Depends(require_roles("admin"))):
+    req = shared.pending(await db.get(RegistrationRequest, req_id))
+    db.add(shared.approve(req, payload, await password_hasher.hash_async(req.password)))
+    await db.commit()
+    return {"status": "approved"}
+
+@router.post("/{req_id}/reject")
+async def reject(req_id: int, db: AsyncSession = Depends(get_async_db), _: dict = Depends(require_roles("admin"))):
+    req = shared.pending(await db.get(RegistrationRequest, req_id))
+    req.status = "rejected"
+    await db.commit()
+    return {"status": "rejected"}
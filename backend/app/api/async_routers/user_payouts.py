@@ -0,0 +1,43 @@
+from typing import Optional
+from datetime import date
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models.user_payout import UserPayout
+from app.schemas.user_payout import UserPayoutCreate, UserPayoutOut
+from app.api.deps import get_async_db, require_roles
+from app.api.pagination import PageParams
+from app.api.shared import user_payouts as shared
+
+router = APIRouter()
+
+@router.get("", response_model=dict)
+async def list_payouts(
+    user_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    params: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    _: dict = Depends(require_roles("admin", "moderator")),
+):
+    page = shared.list_page(user_id, start_date, end_date, params)
+    total = await db.scalar(page.count) if page.count is not None else None
+    return page.response((await db.scalars(page.rows)).all(), total)
+
+@router.post("", response_model=UserPayoutOut, status_code=201)
+async def create_payout(payload: UserPayoutCreate, db: AsyncSession = Depends(get_async_db), _: dict = Depends(require_roles("admin"))):
+    payout, statements = shared.new_payout(payload)
+    db.add(payout)
+    for statement in statements:
+        await db.execute(statement)
+    await db.commit()
+    await db.refresh(payout)
+    return UserPayoutOut.model_validate(payout)
+
+@router.delete("/{payout_id}", status_code=204)
+async def delete_payout(payout_id: int, db: AsyncSession = Depends(get_async_db), _: dict = Depends(require_roles("admin"))):
+    payout = shared.found(await db.get(UserPayout, payout_id))
+    for statement in shared.delete_statements(payout):
+        await db.execute(statement)
+    await db.delete(payout)
+    await db.commit()
+    return
@@ -0,0 +1,69 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models.user import User
+from app.db.balances import user_balances_statement
+from app.schemas.user import UserCreate, UserUpdate, UserOut
+from app.schemas.user_payout import UserBalancesResponse
+from app.core.password_hasher import password_hasher
+from app.api.deps import get_async_db, require_roles
+from app.api.pagination import PageParams
+from app.api.shared import pop_password, require_absent
+from app.api.shared import users as shared
+
+router = APIRouter()
+
+@router.get("", response_model=dict)
+async def list_users(
+    search: Optional[str] = None,
+    role: Optional[str] = None,
+    rank: bool = False,
+    params: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    _: dict = Depends(require_roles("admin", "moderator")),
+):
+    page = shared.list_page(search, role, rank, params)
+    total = await db.scalar(page.count) if page.count is not None else None
+    return page.response((await db.scalars(page.rows)).all(), total)
+
+@router.post("", response_model=UserOut, status_code=201)
+async def create_user(payload: UserCreate, db: AsyncSession = Depends(get_async_db), _: dict = Depends(require_roles("admin"))):
+    require_absent(await db.scalar(shared.phone_taken(payload.phone)), "Phone already exists")
+    user = shared.new_user(payload, await password_hasher.hash_async(payload.password))
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return UserOut.model_validate(user)
+
+@router.get("/balances", response_model=UserBalancesResponse)
+async def user_balances(
+    role: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    size: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+    _: dict = Depends(require_roles("admin", "moderator")),
+):
+    rows = (await db.execute(user_balances_statement(role, page, size))).all()
+    return shared.balances_response(rows, page, size)
+
+@router.get("/{user_id}", response_model=UserOut)
+async def get_user(user_id: int, db: AsyncSession = Depends(get_async_db), _: dict = Depends(require_roles("admin", "moderator"))):
+    return UserOut.model_validate(shared.found(await db.get(User, user_id)))
+
+@router.put("/{user_id}", response_model=UserOut)
+async def update_user(user_id: int, payload: UserUpdate, db: AsyncSession = Depends(get_async_db), _: dict = Depends(require_roles("admin"))):
+    update_data = payload.model_dump(exclude_unset=True)
+    password = pop_password(update_data)
+    password_hash = await password_hasher.hash_async(password) if password else None
+    user = shared.found(await db.get(User, user_id))
+    shared.apply_update(user, update_data, password_hash)
+    await db.commit()
+    await db.refresh(user)
+    return UserOut.model_validate(user)
+
+@router.delete("/{user_id}", status_code=204)
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_async_db), _: dict = Depends(require_roles("admin"))):
+    user = shared.found(await db.get(User, user_id))
+    await db.delete(user)
+    await db.commit()
+    return
@@ -1,18 +1,36 @@
-from typing import Optional
+from typing import AsyncIterator, Iterator, Optional
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError
-from app.core.security import decode_token
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.security import decode_token_cached
+from app.db import session
+from app.db.session import SessionLocal
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
 
+def get_db() -> Iterator[Session]:
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    # Looked up per call: AsyncSessionLocal is None unless USE_ASYNC_DB is set
+    async with session.AsyncSessionLocal() as db:
+        yield db
+
+
 def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)) -> dict:
     if credentials is None:
         raise HTTPException(status_code=401, detail="Not authenticated")
     token = credentials.credentials
     try:
-        payload = decode_token(token)
+        payload = decode_token_cached(token)
         return payload
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
@@ -2,6 +2,8 @@ from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from pydantic import ValidationError
+from sqlalchemy.exc import TimeoutError as SQLAlchemyTimeoutError
+from app.core.password_hasher import PasswordHasherBusy
 
 
 def register_error_handlers(app: FastAPI) -> None:
@@ -25,4 +27,28 @@ def register_error_handlers(app: FastAPI) -> None:
         return JSONResponse(
             status_code=exc.status_code,
             content={"error": {"code": exc.status_code, "message": exc.detail}},
-        )
\ No newline at end of file
+        )
+
+    @app.exception_handler(SQLAlchemyTimeoutError)
+    async def pool_timeout_exception_handler(request: Request, exc: SQLAlchemyTimeoutError):
+        # Raised when no pooled connection frees up within DB_POOL_TIMEOUT
+        return JSONResponse(
+            status_code=503,
+            content={"error": {"code": 503, "message": "Database is busy, try again later"}},
+        )
+
+    @app.exception_handler(PasswordHasherBusy)
+    async def password_hasher_busy_exception_handler(request: Request, exc: PasswordHasherBusy):
+        # Raised when PASSWORD_HASH_MAX_PENDING hash/verify calls are already running or queued
+        return JSONResponse(
+            status_code=503,
+            content={"error": {"code": 503, "message": "Server is busy, try again later"}},
+        )
+
+    @app.exception_handler(Exception)
+    async def unhandled_exception_handler(request: Request, exc: Exception):
+        # Starlette's ServerErrorMiddleware sends this and re-raises; RequestContextMiddleware has logged it
+        return JSONResponse(
+            status_code=500,
+            content={"error": {"code": 500, "message": "Internal server error"}},
+        )
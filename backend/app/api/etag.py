@@ -0,0 +1,23 @@
+import hashlib
+from typing import Any, Optional
+from fastapi import Request, Response
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag from row versions (ids, updated_at, ...) rather than the rendered body."""
+    return '"%s"' % hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+def check_etag(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Return a 304 if the client already holds ``etag``; otherwise tag the response.
+
+    Call before serializing so a match skips the Pydantic work entirely.
+    """
+    header = request.headers.get("if-none-match")
+    if header:
+        # If-None-Match uses weak comparison (RFC 9110 13.1.2)
+        tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return None
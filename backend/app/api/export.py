@@ -0,0 +1,101 @@
+"""Streaming CSV/NDJSON exports.
+
+Export endpoints read plain column rows from a server-side cursor
+(``yield_per``) and encode one partition at a time, optionally through gzip,
+so memory stays flat however many rows are exported. The generators open their
+own session: dependency cleanup runs before a streaming body is sent.
+"""
+import csv
+import io
+import zlib
+from datetime import date
+from decimal import Decimal
+from typing import AsyncIterator, Iterator, Sequence, Union
+import orjson
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from app.db.models.organization import Organization
+from app.db.models.payment import Payment
+from app.db import session
+from app.db.session import SessionLocal
+
+EXPORT_PARTITION_SIZE = 1000
+
+PAYMENT_COLUMNS = (Payment.id, Payment.organization_id, Payment.amount, Payment.source, Payment.payment_date)
+ORGANIZATION_COLUMNS = (
+    Organization.id,
+    Organization.name,
+    Organization.phone,
+    Organization.boss,
+    Organization.plan,
+    Organization.registrator_id,
+    Organization.registration_date,
+    Organization.plan_expiration_days,
+    Organization.is_active,
+)
+
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError
+
+
+class RowEncoder:
+    def __init__(self, columns: Sequence[str], format: str, compress: bool) -> None:
+        self.columns = list(columns)
+        self.format = format
+        # wbits=31 writes a gzip container rather than a raw zlib stream
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def _out(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) if self._compressor else data
+
+    def header(self) -> bytes:
+        return self._out((",".join(self.columns) + "\r\n").encode()) if self.format == "csv" else b""
+
+    def encode(self, rows: Sequence) -> bytes:
+        if self.format == "csv":
+            buf = io.StringIO()
+            csv.writer(buf).writerows(rows)
+            return self._out(buf.getvalue().encode())
+        columns = self.columns
+        return self._out(b"".join(orjson.dumps(dict(zip(columns, r)), default=_json_default) + b"\n" for r in rows))
+
+    def finish(self) -> bytes:
+        return self._compressor.flush() if self._compressor else b""
+
+
+def stream_rows(stmt: Select, encoder: RowEncoder) -> Iterator[bytes]:
+    db = SessionLocal()
+    try:
+        yield encoder.header()
+        for rows in db.execute(stmt.execution_options(yield_per=EXPORT_PARTITION_SIZE)).partitions():
+            chunk = encoder.encode(rows)
+            if chunk:
+                yield chunk
+        yield encoder.finish()
+    finally:
+        db.close()
+
+
+async def stream_rows_async(stmt: Select, encoder: RowEncoder) -> AsyncIterator[bytes]:
+    async with session.AsyncSessionLocal() as db:
+        yield encoder.header()
+        result = await db.stream(stmt.execution_options(yield_per=EXPORT_PARTITION_SIZE))
+        async for rows in result.partitions():
+            chunk = encoder.encode(rows)
+            if chunk:
+                yield chunk
+        yield encoder.finish()
+
+
+def export_response(body: Union[Iterator[bytes], AsyncIterator[bytes]], name: str, format: str, compress: bool) -> StreamingResponse:
+    filename = f"{name}-{date.today().isoformat()}.{format}"
+    media_type = MEDIA_TYPES[format]
+    if compress:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
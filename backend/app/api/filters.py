@@ -0,0 +1,52 @@
+"""List filters shared by the list and export endpoints.
+
+Each takes a ``select()`` of the model or of plain columns and returns it
+filtered.
+"""
+from datetime import date, timedelta
+from typing import Optional, TypeVar
+from sqlalchemy import and_, func, or_
+from app.db.models.branch import Branch
+from app.db.models.device import Device
+from app.db.models.organization import Organization
+from app.db.models.payment import Payment
+from app.api.search import like_pattern
+
+Q = TypeVar("Q")
+
+
+def filter_payments(
+    query: Q,
+    organization_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    source: Optional[str] = None,
+) -> Q:
+    if organization_id:
+        query = query.filter(Payment.organization_id == organization_id)
+    if start_date and end_date:
+        query = query.filter(and_(Payment.payment_date >= start_date, Payment.payment_date <= end_date))
+    if source:
+        query = query.filter(Payment.source == source)
+    return query
+
+
+def filter_organizations(query: Q, search: Optional[str] = None, plan: Optional[str] = None) -> Q:
+    if search:
+        like = like_pattern(search)
+        query = query.filter(or_(func.lower(Organization.name).like(like), Organization.phone.like(like)))
+    if plan:
+        query = query.filter(Organization.plan == plan)
+    return query
+
+
+def filter_stale_devices(query: Q, organization_id: int, age: timedelta) -> Q:
+    """Devices of the organization without a heartbeat for ``age``.
+
+    ``last_seen`` defaults to the creation time, so a plain range keeps the
+    (branch_id, last_seen) index usable.
+    """
+    return query.join(Branch, Device.branch_id == Branch.id).filter(
+        Branch.organization_id == organization_id,
+        Device.last_seen < func.now() - age,
+    )
\ No newline at end of file
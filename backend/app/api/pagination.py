@@ -0,0 +1,114 @@
+import base64
+import json
+from datetime import date
+from typing import Any, Callable, Optional, Sequence, Tuple, TypeVar
+from fastapi import HTTPException, Query
+from sqlalchemy import Select, func, select, tuple_
+from app.api.responses import PydanticJSONResponse, validate_rows
+
+T = TypeVar("T")
+
+
+def encode_cursor(*values: Any) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, date) else v for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *parsers: Callable[[Any], Any]) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(parsers):
+            raise ValueError(cursor)
+        return [parse(value) for parse, value in zip(parsers, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(rows: Sequence[T], size: int, key: Callable[[T], Tuple[Any, ...]]) -> Tuple[list, Optional[str]]:
+    """Trim a ``size + 1`` fetch to ``size`` rows and build the cursor for the next page."""
+    items = list(rows[:size])
+    next_cursor = encode_cursor(*key(items[-1])) if len(rows) > size else None
+    return items, next_cursor
+
+
+def count_statement(stmt: Select) -> Select:
+    """``SELECT count(*)`` over the rows of ``stmt``."""
+    return select(func.count()).select_from(stmt.order_by(None).subquery())
+
+
+class PageParams:
+    """Query parameters shared by the paginated list endpoints."""
+
+    def __init__(
+        self,
+        page: int = Query(1, ge=1),
+        size: int = Query(10, ge=1, le=100),
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+    ) -> None:
+        self.page = page
+        self.size = size
+        self.cursor = cursor
+        self.include_total = include_total
+
+
+class ListPage:
+    """Statements for one page of a list endpoint and the response built from their results.
+
+    Rows come newest first by the ``key`` columns, starting after the cursor's
+    key values when one is given and at the ``page`` offset otherwise. One row
+    more than ``size`` is fetched to tell whether there is a next page. An
+    explicit ``order_by`` (a ranking) has no stable keyset, so it pages by
+    offset only and never returns a cursor.
+
+    A cursor page is not a numbered page and the total does not change while
+    following cursors, so cursor pages neither count the rows nor return
+    ``page``; ``include_total`` only applies to offset pages.
+
+    Routers execute ``count`` (None when there is no total to return) and
+    ``rows`` on their own session and pass the results to ``response``.
+    """
+
+    def __init__(
+        self,
+        stmt: Select,
+        model: type,
+        key: Sequence,
+        parsers: Sequence[Callable[[Any], Any]],
+        params: PageParams,
+        order_by: Optional[Sequence] = None,
+        envelope: Callable[..., Any] = dict,
+    ) -> None:
+        self.model = model
+        self.key = key
+        self.params = params
+        self.envelope = envelope
+        self.keyset = order_by is None
+        self.by_cursor = bool(params.cursor) and self.keyset
+        self.count = count_statement(stmt) if params.include_total and not self.by_cursor else None
+        if self.keyset:
+            stmt = stmt.order_by(*(column.desc() for column in key))
+        else:
+            stmt = stmt.order_by(*order_by)
+        if self.by_cursor:
+            values = decode_cursor(params.cursor, *parsers)
+            stmt = stmt.where(tuple_(*key) < tuple(values) if len(key) > 1 else key[0] < values[0])
+        else:
+            stmt = stmt.offset((params.page - 1) * params.size)
+        self.rows = stmt.limit(params.size + 1)
+
+    def response(self, rows: Sequence, total: Optional[int]) -> PydanticJSONResponse:
+        size = self.params.size
+        items, next_cursor = keyset_page(rows, size, lambda row: tuple(getattr(row, column.key) for column in self.key))
+        if not self.keyset:
+            next_cursor = None
+        return PydanticJSONResponse(
+            self.envelope(
+                items=validate_rows(self.model, items),
+                total=total,
+                page=None if self.by_cursor else self.params.page,
+                size=size,
+                next_cursor=next_cursor,
+            )
+        )
@@ -0,0 +1,28 @@
+"""Single-validation JSON responses for list endpoints.
+
+Returning a ``Response`` makes FastAPI skip its ``response_model`` pass (dump,
+re-validate, ``jsonable_encoder``). List endpoints therefore validate their rows
+once with ``validate_rows`` and render the page with ``PydanticJSONResponse``,
+which serializes straight to bytes in pydantic-core. ``response_model`` stays on
+the route for the OpenAPI schema.
+"""
+from functools import lru_cache
+from typing import Any, Iterable
+from pydantic import TypeAdapter
+from starlette.responses import Response
+
+
+@lru_cache(maxsize=None)
+def _adapter(tp: Any) -> TypeAdapter:
+    return TypeAdapter(tp)
+
+
+def validate_rows(model: type, rows: Iterable[Any]) -> list:
+    return _adapter(list[model]).validate_python(rows, from_attributes=True)
+
+
+class PydanticJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return _adapter(type(content)).dump_json(content)
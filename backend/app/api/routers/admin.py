@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+from app.core.security import token_cache
+from app.db import rollups
+from app.db.pool import pool_status
+from app.db.session import engine, async_engine
+from app.api.deps import require_roles
+
+router = APIRouter()
+
+@router.get("/db-pool", response_model=dict)
+def db_pool(_: dict = Depends(require_roles("admin"))):
+    result = {"sync": pool_status(engine.pool)}
+    if async_engine is not None:
+        result["async"] = pool_status(async_engine.pool)
+    return result
+
+@router.get("/caches", response_model=dict)
+def caches(_: dict = Depends(require_roles("admin"))):
+    return {"tokens": token_cache.stats(), "revenue_analytics": rollups.revenue_cache.stats()}
\ No newline at end of file
@@ -1,27 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from jose import JWTError
-from app.db.session import SessionLocal
 from app.db.models.user import User
 from app.db.models.registration_request import RegistrationRequest
 from app.schemas.user import LoginRequest, LoginResponse, TokenRefreshRequest, TokenRefreshResponse, UserOut
 from app.schemas.registration_request import RegistrationRequestCreate
-from app.core.security import verify_password, create_access_token, create_refresh_token, decode_token
+from app.core.security import create_access_token, create_refresh_token, decode_token
+from app.core.password_hasher import password_hasher
+from app.api.deps import get_db
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/login", response_model=LoginResponse)
 def login(payload: LoginRequest, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.phone == payload.phone, User.is_active == True).first()
-    if not user or not verify_password(payload.password, user.password_hash):
+    valid, new_hash = password_hasher.verify(payload.password, user.password_hash) if user else (False, None)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        user.password_hash = new_hash
+        db.commit()
     access = create_access_token(str(user.id), {"role": user.role})
     refresh = create_refresh_token(str(user.id))
     return LoginResponse(access_token=access, refresh_token=refresh, user=UserOut.model_validate(user))
@@ -0,0 +1,56 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.password_hasher import password_hasher
+from app.db import bulk_import, rollups
+from app.schemas.organization import OrganizationCreate
+from app.schemas.payment import PaymentCreate
+from app.schemas.bulk_import import ImportReport
+from app.api.deps import require_roles
+from app.api.uploads import add_error, read_batches, upload_format
+
+router = APIRouter()
+
+# The body is streamed, so these are async endpoints; each batch's COPY and
+# merge runs on the sync engine in the threadpool, also under USE_ASYNC_DB.
+
+@router.post("/organizations", response_model=ImportReport)
+async def import_organizations(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    _: dict = Depends(require_roles("admin", "moderator")),
+):
+    report = ImportReport()
+    async for batch in read_batches(request, upload_format(request, format), OrganizationCreate, report, settings.import_batch_size):
+        hashes = await password_hasher.hash_many_async([item.password for _, item in batch])
+        rows = [
+            {"row_no": row, **item.model_dump(exclude={"password"}), "password_hash": password_hash}
+            for (row, item), password_hash in zip(batch, hashes)
+        ]
+        imported, errors = await run_in_threadpool(bulk_import.run, bulk_import.load_organizations, rows)
+        report.imported += imported
+        for row, messages in errors:
+            add_error(report, row, messages)
+    report.errors.sort(key=lambda e: e.row)
+    return report
+
+@router.post("/payments", response_model=ImportReport)
+async def import_payments(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    _: dict = Depends(require_roles("admin", "moderator")),
+):
+    report = ImportReport()
+    try:
+        async for batch in read_batches(request, upload_format(request, format), PaymentCreate, report, settings.import_batch_size):
+            rows = [{"row_no": row, **item.model_dump()} for row, item in batch]
+            imported, errors = await run_in_threadpool(bulk_import.run, bulk_import.load_payments, rows)
+            report.imported += imported
+            for row, messages in errors:
+                add_error(report, row, messages)
+    finally:
+        if report.imported:
+            rollups.revenue_cache.clear()
+    report.errors.sort(key=lambda e: e.row)
+    return report
@@ -0,0 +1,50 @@
+from anyio.to_thread import current_default_thread_limiter
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.core.heartbeats import heartbeats
+from app.core.logging import log_writer
+from app.core.metrics import Exposition, rate_limit_rejections, request_metrics
+from app.core.password_hasher import password_hasher
+from app.db.pool import pool_status
+from app.db.session import engine, async_engine
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    page = Exposition()
+    page.histograms(
+        "http_request_duration_seconds",
+        "Request latency by route template and status; _count is the request count.",
+        (({"method": method, "route": route, "status": status}, histogram) for (method, route, status), histogram in request_metrics.series()),
+    )
+    page.sample("http_requests_in_flight", "gauge", "Requests currently being served by this worker.", request_metrics.in_flight)
+
+    pools = [("sync", engine.pool)] + ([("async", async_engine.pool)] if async_engine is not None else [])
+    statuses = [({"pool": name}, pool_status(pool)) for name, pool in pools]
+    for key, help in (
+        ("size", "Configured pool size."),
+        ("checked_out", "Connections checked out of the pool."),
+        ("idle", "Idle connections in the pool."),
+        ("overflow", "Overflow connections open beyond the pool size."),
+    ):
+        page.samples(f"db_pool_{key}", "gauge", help, ((labels, status[key]) for labels, status in statuses))
+    page.histograms(
+        "db_pool_wait_seconds",
+        "Time spent waiting for a pooled connection.",
+        (({"pool": name}, pool.wait_histogram) for name, pool in pools),
+    )
+
+    # Starlette runs sync endpoints and dependencies on this anyio limiter
+    limiter = current_default_thread_limiter()
+    page.sample("threadpool_size", "gauge", "Worker threads available to sync endpoints.", limiter.total_tokens)
+    page.sample("threadpool_busy", "gauge", "Worker threads currently running sync code.", limiter.borrowed_tokens)
+    page.sample("threadpool_waiting", "gauge", "Calls queued for a worker thread.", limiter.statistics().tasks_waiting)
+
+    page.sample("password_hash_pending", "gauge", "bcrypt hash/verify calls running or queued.", password_hasher.pending)
+    page.sample("password_hash_rejected_total", "counter", "bcrypt calls refused with 503 at PASSWORD_HASH_MAX_PENDING.", password_hasher.rejected)
+    page.sample("rate_limit_rejections_total", "counter", "Requests rejected with 429 by the rate limiter.", rate_limit_rejections.value)
+    page.sample("log_lines_dropped_total", "counter", "Log lines dropped because stdout fell behind.", log_writer.dropped)
+    page.sample("heartbeat_buffer_devices", "gauge", "Devices waiting for the next last_seen flush.", len(heartbeats))
+    page.sample("heartbeat_rejected_total", "counter", "Heartbeats refused with 503 because the organization's buffer was full.", heartbeats.rejected)
+    return PlainTextResponse(page.render(), media_type=Exposition.content_type)
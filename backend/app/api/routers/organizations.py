@@ -1,13 +1,11 @@
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from uuid import uuid4
-from app.db.session import SessionLocal
 from app.db.models.organization import Organization
 from app.db.models.branch import Branch
 from app.db.models.device import Device
 from app.db.models.add_on import AddOn
+from app.db import rollups
 from app.schemas.organization import (
     OrganizationCreate,
     OrganizationUpdate,
@@ -17,71 +15,70 @@ from app.schemas.organization import (
     BranchOut,
     DeviceCreate,
     DeviceOut,
+    StaleDeviceOut,
     AddOnCreate,
     AddOnOut,
     LoginResponse,
     LoginRequest,
 )
-from app.api.deps import require_roles
-from app.core.security import get_password_hash, verify_password, create_access_token, create_refresh_token
+from app.api.deps import get_db, require_roles
+from app.api.responses import PydanticJSONResponse, validate_rows
+from app.api.pagination import PageParams
+from app.api.export import stream_rows
+from app.api.etag import check_etag
+from app.api.shared import pop_password, require_absent, require_found
+from app.api.shared import organizations as shared
+from app.core.password_hasher import password_hasher
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("", response_model=OrganizationListResponse)
 def list_organizations(
     search: Optional[str] = None,
-    page: int = Query(1, ge=1),
-    size: int = Query(10, ge=1, le=100),
     plan: Optional[str] = None,
+    rank: bool = False,
+    params: PageParams = Depends(),
     db: Session = Depends(get_db),
     _: dict = Depends(require_roles("admin", "moderator", "registrator")),
 ):
-    query = db.query(Organization)
-    if search:
-        like = f"%{search}%"
-        query = query.filter(func.lower(Organization.name).like(func.lower(like)))
-    if plan:
-        query = query.filter(Organization.plan == plan)
-    total = query.count()
-    items = query.order_by(Organization.id.desc()).offset((page - 1) * size).limit(size).all()
-    return OrganizationListResponse(items=[OrganizationOut.model_validate(i) for i in items], total=total, page=page, size=size)
+    page = shared.list_page(search, plan, rank, params)
+    total = db.scalar(page.count) if page.count is not None else None
+    return page.response(db.scalars(page.rows).all(), total)
+
+# Declared before /{org_id} so "export" is not parsed as an id
+@router.get("/export")
+def export_organizations(
+    search: Optional[str] = None,
+    plan: Optional[str] = None,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    _: dict = Depends(require_roles("admin", "moderator", "registrator")),
+):
+    return shared.export(search, plan, format, gzip, stream_rows)
 
 @router.post("", response_model=OrganizationOut, status_code=201)
 def create_organization(payload: OrganizationCreate, db: Session = Depends(get_db), _: dict = Depends(require_roles("admin", "moderator"))):
-    existing_org = db.query(Organization).filter(Organization.phone == payload.phone).first()
-    if existing_org:
-        raise HTTPException(status_code=400, detail="Organization with this phone number already exists")
-    org_data = payload.model_dump()
-    password = org_data.pop("password")
-    org = Organization(**org_data, password_hash=get_password_hash(password))
+    require_absent(db.scalar(shared.phone_taken(payload.phone)), "Organization with this phone number already exists")
+    org = shared.new_organization(payload, password_hasher.hash(payload.password))
     db.add(org)
     db.commit()
-    db.refresh(org)
-    return OrganizationOut.model_validate(org)
+    return OrganizationOut.model_validate(db.scalar(shared.by_id(org.id)))
 
 @router.get("/{org_id}", response_model=OrganizationOut)
 def get_organization(
-    org_id: int, 
-    db: Session = Depends(get_db), 
+    org_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
     payload: dict = Depends(require_roles("admin", "moderator", "registrator", "organization")),
 ):
-    org = db.get(Organization, org_id)
-    if not org:
-        raise HTTPException(status_code=404, detail="Organization not found")
-    if payload.get("role") == "registrator" and org.registrator_id != int(payload.get("sub")):
-        raise HTTPException(status_code=403, detail="Forbidden")
-    
-    org_out = OrganizationOut.model_validate(org)
-    if payload.get("role") == "admin":
-        org_out.password = org.password_hash
-    return org_out
+    org = shared.found(db.scalar(shared.by_id(org_id)))
+    if shared.is_registrator(payload):
+        shared.check_registrator(org, payload)
+    not_modified = check_etag(request, response, shared.organization_etag(org, payload))
+    if not_modified:
+        return not_modified
+    return shared.organization_out(org, payload)
 
 
 @router.get("/phone/{phone}", response_model=OrganizationOut)
@@ -90,86 +87,60 @@ def get_organization_by_phone_number(
     db: Session = Depends(get_db),
     payload: dict = Depends(require_roles("admin", "moderator", "registrator", "organization")),
 ):
-    org = db.query(Organization).filter(Organization.phone == phone).first()
-    if not org:
-        raise HTTPException(status_code=404, detail="Organization not found")
-    if payload.get("role") == "registrator" and org.registrator_id != int(
-        payload.get("sub")
-    ):
-        raise HTTPException(status_code=403, detail="Forbidden")
-    
-    org_out = OrganizationOut.model_validate(org)
-    if payload.get("role") == "admin":
-        org_out.password = org.password_hash
-    return org_out
+    org = shared.found(db.scalar(shared.by_phone(phone)))
+    if shared.is_registrator(payload):
+        shared.check_registrator(org, payload)
+    return shared.organization_out(org, payload)
 
 @router.put("/{org_id}", response_model=OrganizationOut)
 def update_organization(org_id: int, payload: OrganizationUpdate, db: Session = Depends(get_db), _: dict = Depends(require_roles("admin", "moderator", "organization"))):
-    org = db.get(Organization, org_id)
-    if not org:
-        raise HTTPException(status_code=404, detail="Organization not found")
     update_data = payload.model_dump(exclude_unset=True)
-    if "password" in update_data and update_data["password"]:
-        org.password_hash = get_password_hash(update_data.pop("password"))
-    for k, v in update_data.items():
-        setattr(org, k, v)
-    db.add(org)
+    password = pop_password(update_data)
+    password_hash = password_hasher.hash(password) if password else None
+    org = shared.found(db.get(Organization, org_id, with_for_update=True))
+    statements, regroups_revenue = shared.apply_update(org, update_data, password_hash)
+    for statement in statements:
+        db.execute(statement)
     db.commit()
-    db.refresh(org)
-    return OrganizationOut.model_validate(org)
+    if regroups_revenue:
+        rollups.revenue_cache.clear()
+    return OrganizationOut.model_validate(db.scalar(shared.by_id(org_id)))
 
 @router.delete("/{org_id}", status_code=204)
 def delete_organization(org_id: int, db: Session = Depends(get_db), _: dict = Depends(require_roles("admin"))):
-    org = db.get(Organization, org_id)
-    if not org:
-        raise HTTPException(status_code=404, detail="Organization not found")
+    org = shared.found(db.get(Organization, org_id, with_for_update=True))
+    for statement in shared.delete_statements(org):
+        db.execute(statement)
     db.delete(org)
     db.commit()
+    rollups.revenue_cache.clear()
     return
 
 @router.post("/login", response_model=LoginResponse)
 def login(payload: LoginRequest, db: Session = Depends(get_db)):
-    org = db.query(Organization).filter(Organization.phone == payload.phone).first()
-
-    if not org or not verify_password(payload.password, org.password_hash):
-        raise HTTPException(
-            status_code=401,
-            detail="Incorrect phone or password",
-        )
-    access_token = create_access_token(str(org.id), {"role": "organization"})
-    refresh_token = create_refresh_token(str(org.id))
-    return LoginResponse(
-        access_token=access_token, 
-        refresh_token=refresh_token, 
-        user=OrganizationOut.model_validate(org)
-    )
+    org = db.scalar(shared.by_phone(payload.phone))
+    valid, new_hash = password_hasher.verify(payload.password, org.password_hash) if org else (False, None)
+    if new_hash:
+        org.password_hash = new_hash
+        db.commit()
+    return shared.login_response(org, valid)
 
 @router.get("/{org_id}/branches", response_model=list[BranchOut])
 def list_branches(
-    org_id: int, 
+    org_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     payload: dict = Depends(require_roles("admin", "moderator", "registrator", "organization")),
 ):
-    if payload.get("role") == "registrator":
-        org = db.get(Organization, org_id)
-        if not org or org.registrator_id != int(payload.get("sub")):
-            raise HTTPException(status_code=403, detail="Forbidden")
-    q = db.query(Branch).filter(Branch.organization_id == org_id)
-    branches = q.all()
-    return [BranchOut.model_validate(b) for b in branches]
+    if shared.is_registrator(payload):
+        shared.check_registrator(db.get(Organization, org_id), payload)
+    return shared.cached_list(request, response, "branches", org_id, db.scalars(shared.branches(org_id)).all(), BranchOut)
 
 @router.post("/{org_id}/branches", response_model=BranchOut, status_code=201)
 def create_branch(org_id: int, payload: BranchCreate, db: Session = Depends(get_db), _: dict = Depends(require_roles("admin", "moderator", "organization"))):
-    org = db.get(Organization, org_id)
-    if not org:
-        raise HTTPException(status_code=404, detail="Organization not found")
-    existing_branch = db.query(Branch).filter(
-        Branch.organization_id == org_id,
-        Branch.name == payload.name,
-        Branch.location == payload.location
-    ).first()
-    if existing_branch:
-        raise HTTPException(status_code=400, detail="Branch with this name and location already exists in this organization")
+    shared.found(db.get(Organization, org_id))
+    require_absent(db.scalar(shared.branch_exists(org_id, payload)), "Branch with this name and location already exists in this organization")
     branch = Branch(organization_id=org_id, **payload.model_dump())
     db.add(branch)
     db.commit()
@@ -178,87 +149,73 @@ def create_branch(org_id: int, payload: BranchCreate, db: Session = Depends(get_
 
 @router.get("/{org_id}/devices", response_model=list[DeviceOut])
 def list_devices(
-    org_id: int, 
+    org_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     payload: dict = Depends(require_roles("admin", "moderator", "registrator", "organization")),
     ):
-    if payload.get("role") == "registrator":
-        org = db.get(Organization, org_id)
-        if not org or org.registrator_id != int(payload.get("sub")):
-            raise HTTPException(status_code=403, detail="Forbidden")
-    devices = (
-        db.query(Device)
-        .join(Branch, Device.branch_id == Branch.id)
-        .filter(Branch.organization_id == org_id)
-        .all()
-    )
-    return [DeviceOut.model_validate(d) for d in devices]
+    if shared.is_registrator(payload):
+        shared.check_registrator(db.get(Organization, org_id), payload)
+    return shared.cached_list(request, response, "devices", org_id, db.scalars(shared.devices(org_id)).all(), DeviceOut)
 
 @router.post("/{org_id}/devices", response_model=DeviceOut, status_code=201)
 def create_device(org_id: int, payload: DeviceCreate, db: Session = Depends(get_db), _: dict = Depends(require_roles("admin", "moderator", "organization"))):
-    branch = db.get(Branch, payload.branch_id)
-    if not branch or branch.organization_id != org_id:
-        raise HTTPException(status_code=400, detail="Invalid branch")
-        
-    existing_device = db.query(Device).filter(
-        Device.branch_id == payload.branch_id,
-        Device.name == payload.name,
-        Device.os == payload.os
-    ).first()
-    if existing_device:
-        raise HTTPException(status_code=400, detail="Device with this name and OS already exists in this branch")
-    
-    device = Device(id=str(uuid4()), branch_id=payload.branch_id, name=payload.name, os=payload.os)
+    shared.check_branch(db.get(Branch, payload.branch_id), org_id)
+    require_absent(db.scalar(shared.device_exists(payload)), "Device with this name and OS already exists in this branch")
+    device = shared.new_device(payload)
     db.add(device)
     db.commit()
     db.refresh(device)
     return DeviceOut.model_validate(device)
 
+@router.get("/{org_id}/devices/stale", response_model=list[StaleDeviceOut])
+def list_stale_devices(
+    org_id: int,
+    hours: int = Query(24, ge=1),
+    page: int = Query(1, ge=1),
+    size: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    payload: dict = Depends(require_roles("admin", "moderator", "registrator", "organization")),
+):
+    shared.check_own_organization(org_id, payload)
+    if shared.is_registrator(payload):
+        shared.check_registrator(db.get(Organization, org_id), payload)
+    devices = db.scalars(shared.stale_devices(org_id, hours, page, size)).all()
+    return PydanticJSONResponse(validate_rows(StaleDeviceOut, devices))
+
 @router.put("/{org_id}/devices/{device_id}", response_model=DeviceOut)
 def update_device(org_id: int, device_id: str, payload: DeviceCreate, db: Session = Depends(get_db), _: dict = Depends(require_roles("admin", "moderator", "organization"))):
-    device = db.get(Device, device_id)
-    if not device:
-        raise HTTPException(status_code=404, detail="Device not found")
-    branch = db.get(Branch, payload.branch_id)
-    if not branch or branch.organization_id != org_id:
-        raise HTTPException(status_code=400, detail="Invalid branch")
-    device.branch_id = payload.branch_id
-    device.name = payload.name
-    device.os = payload.os
-    db.add(device)
+    device = require_found(db.get(Device, device_id), "Device not found")
+    shared.check_branch(db.get(Branch, payload.branch_id), org_id)
+    shared.update_device(device, payload)
     db.commit()
     db.refresh(device)
     return DeviceOut.model_validate(device)
 
 @router.delete("/{org_id}/devices/{device_id}", status_code=204)
 def delete_device(org_id: int, device_id: str, db: Session = Depends(get_db), _: dict = Depends(require_roles("admin", "moderator", "organization"))):
-    device = db.get(Device, device_id)
-    if not device:
-        raise HTTPException(status_code=404, detail="Device not found")
-    # ensure belongs to org
-    branch = db.get(Branch, device.branch_id)
-    if not branch or branch.organization_id != org_id:
-        raise HTTPException(status_code=400, detail="Invalid organization")
+    device = require_found(db.get(Device, device_id), "Device not found")
+    shared.check_branch(db.get(Branch, device.branch_id), org_id, "Invalid organization")
     db.delete(device)
     db.commit()
     return
 
 @router.get("/{org_id}/add-ons", response_model=list[AddOnOut])
 def list_addons(
-    org_id: int, 
+    org_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     payload: dict = Depends(require_roles("admin", "moderator", "registrator", "organization")),
     ):
-    if payload.get("role") == "registrator":
-        org = db.get(Organization, org_id)
-        if not org or org.registrator_id != int(payload.get("sub")):
-            raise HTTPException(status_code=403, detail="Forbidden")
-    addons = db.query(AddOn).filter(AddOn.organization_id == org_id).all()
-    return [AddOnOut.model_validate(a) for a in addons]
+    if shared.is_registrator(payload):
+        shared.check_registrator(db.get(Organization, org_id), payload)
+    return shared.cached_list(request, response, "add-ons", org_id, db.scalars(shared.addons(org_id)).all(), AddOnOut)
 
 @router.post("/{org_id}/add-ons", response_model=AddOnOut, status_code=201)
 def create_addon(org_id: int, payload: AddOnCreate, db: Session = Depends(get_db), _: dict = Depends(require_roles("admin", "moderator", "organization"))):
-    addon = AddOn(id=str(uuid4()), organization_id=org_id, **payload.model_dump())
+    addon = shared.new_addon(org_id, payload)
     db.add(addon)
     db.commit()
     db.refresh(addon)
@@ -266,9 +223,7 @@ def create_addon(org_id: int, payload: AddOnCreate, db: Session = Depends(get_db
 
 @router.delete("/{org_id}/add-ons/{addon_id}", status_code=204)
 def delete_addon(org_id: int, addon_id: str, db: Session = Depends(get_db), _: dict = Depends(require_roles("admin", "moderator", "organization"))):
-    addon = db.get(AddOn, addon_id)
-    if not addon or addon.organization_id != org_id:
-        raise HTTPException(status_code=404, detail="Add-on not found")
+    addon = shared.found_addon(db.get(AddOn, addon_id), org_id)
     db.delete(addon)
     db.commit()
-    return
\ No newline at end of file
+    return
@@ -1,59 +1,73 @@
 from typing import Optional
 from datetime import date
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
-from app.db.session import SessionLocal
-from app.db.models.payment import Payment
-from app.schemas.payment import PaymentCreate, PaymentOut, PaymentListResponse, SverkaResponse
-from app.api.deps import require_roles
+from app.db import rollups
+from app.schemas.payment import PaymentCreate, PaymentOut, PaymentListResponse, SverkaResponse, RevenueAnalyticsResponse
+from app.api.deps import get_db, require_roles
+from app.api.pagination import PageParams
+from app.api.export import stream_rows
+from app.api.shared import payments as shared
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("", response_model=PaymentListResponse)
 def list_payments(
     organization_id: Optional[int] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     source: Optional[str] = None,
-    page: int = Query(1, ge=1),
-    size: int = Query(10, ge=1, le=100),
+    params: PageParams = Depends(),
     db: Session = Depends(get_db),
     _: dict = Depends(require_roles("admin", "moderator")),
 ):
-    query = db.query(Payment)
-    if organization_id:
-        query = query.filter(Payment.organization_id == organization_id)
-    if start_date and end_date:
-        query = query.filter(and_(Payment.payment_date >= start_date, Payment.payment_date <= end_date))
-    if source:
-        query = query.filter(Payment.source == source)
-    total = query.count()
-    items = query.order_by(Payment.payment_date.desc()).offset((page - 1) * size).limit(size).all()
-    return PaymentListResponse(items=[PaymentOut.model_validate(i) for i in items], total=total, page=page, size=size)
+    page = shared.list_page(organization_id, start_date, end_date, source, params)
+    total = db.scalar(page.count) if page.count is not None else None
+    return page.response(db.scalars(page.rows).all(), total)
+
+@router.get("/export")
+def export_payments(
+    organization_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    source: Optional[str] = None,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    _: dict = Depends(require_roles("admin", "moderator")),
+):
+    return shared.export(organization_id, start_date, end_date, source, format, gzip, stream_rows)
 
 @router.post("", response_model=PaymentOut, status_code=201)
 def create_payment(payload: PaymentCreate, db: Session = Depends(get_db), _: dict = Depends(require_roles("admin", "moderator"))):
-    payment = Payment(**payload.model_dump())
+    payment, statements = shared.new_payment(payload)
     db.add(payment)
+    for statement in statements:
+        db.execute(statement)
     db.commit()
+    rollups.revenue_cache.clear()
     db.refresh(payment)
     return PaymentOut.model_validate(payment)
 
 @router.get("/sverka/{organization_id}", response_model=SverkaResponse)
 def sverka(organization_id: int, start_date: date, end_date: date, db: Session = Depends(get_db), _: dict = Depends(require_roles("admin", "moderator"))):
-    total = (
-        db.query(func.coalesce(func.sum(Payment.amount), 0))
-        .filter(Payment.organization_id == organization_id)
-        .filter(Payment.payment_date >= start_date)
-        .filter(Payment.payment_date <= end_date)
-        .scalar()
-    )
-    return SverkaResponse(organization_id=organization_id, start_date=start_date, end_date=end_date, total_amount=float(total))
\ No newline at end of file
+    total = db.scalar(rollups.revenue_total(start_date, end_date, organization_id))
+    return SverkaResponse(organization_id=organization_id, start_date=start_date, end_date=end_date, total_amount=float(total))
+
+@router.get("/analytics", response_model=RevenueAnalyticsResponse)
+def revenue_analytics(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    organization_id: Optional[int] = None,
+    source: Optional[str] = None,
+    plan: Optional[str] = None,
+    registrator_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    _: dict = Depends(require_roles("admin", "moderator")),
+):
+    filters = (start_date, end_date, organization_id, source, plan, registrator_id)
+    key = shared.analytics_key(filters)
+    cached = rollups.revenue_cache.get(key)
+    if cached is not None:
+        return cached
+    rows = db.execute(rollups.revenue_breakdown_statement(*filters)).all()
+    return shared.analytics_response(key, start_date, end_date, rows)
@@ -1,54 +1,43 @@
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import date
+from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from app.db.session import SessionLocal
 from app.db.models.user_payout import UserPayout
 from app.schemas.user_payout import UserPayoutCreate, UserPayoutOut
-from app.api.deps import require_roles
+from app.api.deps import get_db, require_roles
+from app.api.pagination import PageParams
+from app.api.shared import user_payouts as shared
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("", response_model=dict)
 def list_payouts(
     user_id: Optional[int] = None,
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
-    page: int = Query(1, ge=1),
-    size: int = Query(10, ge=1, le=100),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    params: PageParams = Depends(),
     db: Session = Depends(get_db),
     _: dict = Depends(require_roles("admin", "moderator")),
 ):
-    query = db.query(UserPayout)
-    if user_id:
-        query = query.filter(UserPayout.user_id == user_id)
-    if start_date:
-        query = query.filter(UserPayout.payout_date >= start_date)
-    if end_date:
-        query = query.filter(UserPayout.payout_date <= end_date)
-    total = query.count()
-    items = query.order_by(UserPayout.payout_date.desc()).offset((page - 1) * size).limit(size).all()
-    return {"items": [UserPayoutOut.model_validate(i) for i in items], "total": total, "page": page, "size": size}
+    page = shared.list_page(user_id, start_date, end_date, params)
+    total = db.scalar(page.count) if page.count is not None else None
+    return page.response(db.scalars(page.rows).all(), total)
 
 @router.post("", response_model=UserPayoutOut, status_code=201)
 def create_payout(payload: UserPayoutCreate, db: Session = Depends(get_db), _: dict = Depends(require_roles("admin"))):
-    payout = UserPayout(**payload.model_dump())
+    payout, statements = shared.new_payout(payload)
     db.add(payout)
+    for statement in statements:
+        db.execute(statement)
     db.commit()
     db.refresh(payout)
     return UserPayoutOut.model_validate(payout)
 
 @router.delete("/{payout_id}", status_code=204)
 def delete_payout(payout_id: int, db: Session = Depends(get_db), _: dict = Depends(require_roles("admin"))):
-    payout = db.get(UserPayout, payout_id)
-    if not payout:
-        raise HTTPException(status_code=404, detail="Payout not found")
+    payout = shared.found(db.get(UserPayout, payout_id))
+    for statement in shared.delete_statements(payout):
+        db.execute(statement)
     db.delete(payout)
     db.commit()
-    return
\ No newline at end of file
+    return
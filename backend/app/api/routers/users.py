@@ -1,106 +1,69 @@
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.db.session import SessionLocal
 from app.db.models.user import User
-from app.db.models.payment import Payment
-from app.db.models.user_payout import UserPayout
+from app.db.balances import user_balances_statement
 from app.schemas.user import UserCreate, UserUpdate, UserOut
-from app.core.security import get_password_hash
-from app.api.deps import require_roles
+from app.schemas.user_payout import UserBalancesResponse
+from app.core.password_hasher import password_hasher
+from app.api.deps import get_db, require_roles
+from app.api.pagination import PageParams
+from app.api.shared import pop_password, require_absent
+from app.api.shared import users as shared
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("", response_model=dict)
 def list_users(
     search: Optional[str] = None,
-    page: int = Query(1, ge=1),
-    size: int = Query(10, ge=1, le=100),
     role: Optional[str] = None,
+    rank: bool = False,
+    params: PageParams = Depends(),
     db: Session = Depends(get_db),
     _: dict = Depends(require_roles("admin", "moderator")),
 ):
-    query = db.query(User)
-    if search:
-        like = f"%{search}%"
-        query = query.filter(func.lower(User.full_name).like(func.lower(like)))
-    if role:
-        query = query.filter(User.role == role)
-    total = query.count()
-    items = query.order_by(User.id.desc()).offset((page - 1) * size).limit(size).all()
-    return {"items": [UserOut.model_validate(u) for u in items], "total": total, "page": page, "size": size}
+    page = shared.list_page(search, role, rank, params)
+    total = db.scalar(page.count) if page.count is not None else None
+    return page.response(db.scalars(page.rows).all(), total)
 
 @router.post("", response_model=UserOut, status_code=201)
 def create_user(payload: UserCreate, db: Session = Depends(get_db), _: dict = Depends(require_roles("admin"))):
-    exists = db.query(User).filter(User.phone == payload.phone).first()
-    if exists:
-        raise HTTPException(status_code=400, detail="Phone already exists")
-    user = User(
-        full_name=payload.full_name,
-        phone=payload.phone,
-        password_hash=get_password_hash(payload.password),
-        address=payload.address,
-        role=payload.role,
-        share_percentage=payload.share_percentage,
-    )
+    require_absent(db.scalar(shared.phone_taken(payload.phone)), "Phone already exists")
+    user = shared.new_user(payload, password_hasher.hash(payload.password))
     db.add(user)
     db.commit()
     db.refresh(user)
     return UserOut.model_validate(user)
 
+@router.get("/balances", response_model=UserBalancesResponse)
+def user_balances(
+    role: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    size: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    _: dict = Depends(require_roles("admin", "moderator")),
+):
+    rows = db.execute(user_balances_statement(role, page, size)).all()
+    return shared.balances_response(rows, page, size)
+
 @router.get("/{user_id}", response_model=UserOut)
 def get_user(user_id: int, db: Session = Depends(get_db), _: dict = Depends(require_roles("admin", "moderator"))):
-    user = db.get(User, user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return UserOut.model_validate(user)
+    return UserOut.model_validate(shared.found(db.get(User, user_id)))
 
 @router.put("/{user_id}", response_model=UserOut)
 def update_user(user_id: int, payload: UserUpdate, db: Session = Depends(get_db), _: dict = Depends(require_roles("admin"))):
-    user = db.get(User, user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    for field, value in payload.model_dump(exclude_unset=True).items():
-        if field == "password" and value:
-            setattr(user, "password_hash", get_password_hash(value))
-        elif field != "password":
-            setattr(user, field, value)
-    db.add(user)
+    update_data = payload.model_dump(exclude_unset=True)
+    password = pop_password(update_data)
+    password_hash = password_hasher.hash(password) if password else None
+    user = shared.found(db.get(User, user_id))
+    shared.apply_update(user, update_data, password_hash)
     db.commit()
     db.refresh(user)
     return UserOut.model_validate(user)
 
 @router.delete("/{user_id}", status_code=204)
 def delete_user(user_id: int, db: Session = Depends(get_db), _: dict = Depends(require_roles("admin"))):
-    user = db.get(User, user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    user = shared.found(db.get(User, user_id))
     db.delete(user)
     db.commit()
     return
-
-@router.get("/balances", response_model=dict)
-def user_balances(db: Session = Depends(get_db), _: dict = Depends(require_roles("admin", "moderator"))):
-    users = db.query(User).all()
-    result = []
-    for u in users:
-        total_earnings = db.query(func.coalesce(func.sum(Payment.amount), 0)).scalar()  # Simplified: overall earnings
-        total_payouts = db.query(func.coalesce(func.sum(UserPayout.amount), 0)).filter(UserPayout.user_id == u.id).scalar() or 0
-        current_balance = float(total_earnings) * float(u.share_percentage) / 100 - float(total_payouts)
-        result.append({
-            "id": u.id,
-            "full_name": u.full_name,
-            "share_percentage": float(u.share_percentage),
-            "total_earnings": float(total_earnings),
-            "total_payouts": float(total_payouts),
-            "current_balance": float(current_balance),
-        })
-    return {"users": result}
\ No newline at end of file
@@ -0,0 +1,12 @@
+from sqlalchemy import func
+from sqlalchemy.sql.elements import ColumnElement
+
+
+def like_pattern(term: str) -> str:
+    """Lower-cased ``%term%`` pattern with LIKE wildcards in the term escaped."""
+    escaped = term.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def similarity(column: ColumnElement, term: str) -> ColumnElement:
+    return func.similarity(func.lower(column), term.lower())
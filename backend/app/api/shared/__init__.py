@@ -0,0 +1,31 @@
+"""What the sync (``app.api.routers``) and async (``app.api.async_routers``)
+endpoints have in common.
+
+Nothing here touches a session: the helpers build the statements a router
+executes, check what it loaded and shape what it returns, so the two trees
+only differ in how they run the statements. Routes that need no database are
+declared once here, on a module's ``router``, and included by both trees.
+"""
+from typing import Optional, TypeVar
+from fastapi import HTTPException
+
+T = TypeVar("T")
+
+
+def require_found(obj: Optional[T], detail: str) -> T:
+    if obj is None:
+        raise HTTPException(status_code=404, detail=detail)
+    return obj
+
+
+def require_absent(obj: object, detail: str) -> None:
+    if obj is not None:
+        raise HTTPException(status_code=400, detail=detail)
+
+
+def pop_password(update_data: dict) -> Optional[str]:
+    """Take a new password out of an update so it can be hashed before the row is locked.
+
+    Hashing first keeps the lock from being held for the duration of bcrypt.
+    """
+    return update_data.pop("password", None) or None
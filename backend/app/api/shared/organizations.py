@@ -0,0 +1,235 @@
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional, Sequence
+from uuid import uuid4
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import Select, select
+from sqlalchemy.orm import selectinload
+from app.db.models.organization import Organization
+from app.db.models.branch import Branch
+from app.db.models.device import Device
+from app.db.models.add_on import AddOn
+from app.db import balances
+from app.schemas.organization import (
+    OrganizationCreate,
+    OrganizationOut,
+    OrganizationListResponse,
+    BranchCreate,
+    DeviceCreate,
+    DeviceHeartbeat,
+    DeviceHeartbeatAccepted,
+    DevicePresence,
+    DevicePresenceItem,
+    AddOnCreate,
+    LoginResponse,
+)
+from app.api.deps import require_roles
+from app.api.shared import require_found
+from app.api.pagination import ListPage, PageParams
+from app.api.search import similarity
+from app.api.filters import filter_organizations, filter_stale_devices
+from app.api.export import ORGANIZATION_COLUMNS, RowEncoder, export_response
+from app.api.etag import make_etag, check_etag
+from app.core.security import create_access_token, create_refresh_token
+from app.core.heartbeats import heartbeats
+from app.core.presence import presence
+
+router = APIRouter()
+
+# OrganizationOut embeds branches; load them in one batched query per page
+# instead of one lazy load per organization (an AsyncSession cannot lazy load at all).
+with_branches = selectinload(Organization.branches)
+
+
+def list_page(search: Optional[str], plan: Optional[str], rank: bool, params: PageParams) -> ListPage:
+    stmt = filter_organizations(select(Organization), search, plan).options(with_branches)
+    order_by = (similarity(Organization.name, search).desc(), Organization.id.desc()) if search and rank else None
+    return ListPage(stmt, OrganizationOut, (Organization.id,), (int,), params, order_by, OrganizationListResponse)
+
+
+def export(search: Optional[str], plan: Optional[str], format: str, gzip: bool, stream: Callable) -> Response:
+    """``stream`` is ``stream_rows`` or ``stream_rows_async``."""
+    stmt = filter_organizations(select(*ORGANIZATION_COLUMNS), search, plan).order_by(Organization.id)
+    encoder = RowEncoder([c.key for c in ORGANIZATION_COLUMNS], format, gzip)
+    return export_response(stream(stmt, encoder), "organizations", format, gzip)
+
+
+def by_id(org_id: int) -> Select:
+    # populate_existing so a reload after commit is not answered from the identity map
+    return select(Organization).options(with_branches).where(Organization.id == org_id).execution_options(populate_existing=True)
+
+
+def by_phone(phone: str) -> Select:
+    return select(Organization).options(with_branches).where(Organization.phone == phone).limit(1)
+
+
+def phone_taken(phone: str) -> Select:
+    return select(Organization.id).where(Organization.phone == phone).limit(1)
+
+
+def found(org: Optional[Organization]) -> Organization:
+    return require_found(org, "Organization not found")
+
+
+def is_registrator(token: dict) -> bool:
+    return token.get("role") == "registrator"
+
+
+def check_registrator(org: Optional[Organization], token: dict) -> None:
+    """Registrators may only read the organizations they registered."""
+    if not org or org.registrator_id != int(token.get("sub")):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+def check_own_organization(org_id: int, token: dict) -> None:
+    if token.get("role") == "organization" and int(token.get("sub")) != org_id:
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+def organization_out(org: Organization, token: dict) -> OrganizationOut:
+    org_out = OrganizationOut.model_validate(org)
+    if token.get("role") == "admin":
+        org_out.password = org.password_hash
+    return org_out
+
+
+def organization_etag(org: Organization, token: dict) -> str:
+    return make_etag("organization", org.id, org.updated_at, [(b.id, b.updated_at) for b in org.branches], token.get("role") == "admin")
+
+
+def new_organization(payload: OrganizationCreate, password_hash: str) -> Organization:
+    return Organization(**payload.model_dump(exclude={"password"}), password_hash=password_hash)
+
+
+def apply_update(org: Organization, update_data: dict, password_hash: Optional[str]) -> tuple[list, bool]:
+    """Apply an update to a locked organization.
+
+    Returns the balance statements to run with it and whether the update
+    regroups revenue (so the analytics cache has to be cleared on commit).
+    """
+    statements = []
+    if password_hash:
+        org.password_hash = password_hash
+    if "registrator_id" in update_data and update_data["registrator_id"] != org.registrator_id:
+        if org.registrator_id is not None:
+            statements.append(balances.move_organization_earnings(org.id, org.registrator_id, -1))
+        if update_data["registrator_id"] is not None:
+            statements.append(balances.move_organization_earnings(org.id, update_data["registrator_id"], 1))
+    regroups_revenue = any(k in update_data for k in ("plan", "registrator_id"))
+    for k, v in update_data.items():
+        setattr(org, k, v)
+    return statements, regroups_revenue
+
+
+def delete_statements(org: Organization) -> list:
+    # The organization's payments are deleted with it
+    if org.registrator_id is None:
+        return []
+    return [balances.move_organization_earnings(org.id, org.registrator_id, -1)]
+
+
+def login_response(org: Optional[Organization], valid: bool) -> LoginResponse:
+    if not valid:
+        raise HTTPException(
+            status_code=401,
+            detail="Incorrect phone or password",
+        )
+    return LoginResponse(
+        access_token=create_access_token(str(org.id), {"role": "organization"}),
+        refresh_token=create_refresh_token(str(org.id)),
+        user=OrganizationOut.model_validate(org),
+    )
+
+
+def cached_list(request: Request, response: Response, kind: str, org_id: int, rows: Sequence, model: type):
+    """``rows`` as ``model``, or a 304 when the client's ETag still matches."""
+    not_modified = check_etag(request, response, make_etag(kind, org_id, [(x.id, x.updated_at) for x in rows]))
+    if not_modified:
+        return not_modified
+    return [model.model_validate(x) for x in rows]
+
+
+def branches(org_id: int) -> Select:
+    return select(Branch).where(Branch.organization_id == org_id)
+
+
+def branch_exists(org_id: int, payload: BranchCreate) -> Select:
+    return select(Branch.id).where(
+        Branch.organization_id == org_id,
+        Branch.name == payload.name,
+        Branch.location == payload.location,
+    ).limit(1)
+
+
+def devices(org_id: int) -> Select:
+    return select(Device).join(Branch, Device.branch_id == Branch.id).where(Branch.organization_id == org_id)
+
+
+def device_exists(payload: DeviceCreate) -> Select:
+    return select(Device.id).where(
+        Device.branch_id == payload.branch_id,
+        Device.name == payload.name,
+        Device.os == payload.os,
+    ).limit(1)
+
+
+def stale_devices(org_id: int, hours: int, page: int, size: int) -> Select:
+    return (
+        filter_stale_devices(select(Device), org_id, timedelta(hours=hours))
+        .order_by(Device.last_seen.asc(), Device.id)
+        .offset((page - 1) * size)
+        .limit(size)
+    )
+
+
+def check_branch(branch: Optional[Branch], org_id: int, detail: str = "Invalid branch") -> None:
+    if not branch or branch.organization_id != org_id:
+        raise HTTPException(status_code=400, detail=detail)
+
+
+def new_device(payload: DeviceCreate) -> Device:
+    return Device(id=str(uuid4()), branch_id=payload.branch_id, name=payload.name, os=payload.os)
+
+
+def update_device(device: Device, payload: DeviceCreate) -> None:
+    device.branch_id = payload.branch_id
+    device.name = payload.name
+    device.os = payload.os
+
+
+def addons(org_id: int) -> Select:
+    return select(AddOn).where(AddOn.organization_id == org_id)
+
+
+def new_addon(org_id: int, payload: AddOnCreate) -> AddOn:
+    return AddOn(id=str(uuid4()), organization_id=org_id, **payload.model_dump())
+
+
+def found_addon(addon: Optional[AddOn], org_id: int) -> AddOn:
+    if not addon or addon.organization_id != org_id:
+        raise HTTPException(status_code=404, detail="Add-on not found")
+    return addon
+
+
+# Device check-ins only touch the in-memory buffer; last_seen and presence are updated when it is flushed
+@router.post("/{org_id}/devices/heartbeat", response_model=DeviceHeartbeatAccepted, status_code=202)
+async def device_heartbeat(
+    org_id: int,
+    payload: DeviceHeartbeat,
+    token: dict = Depends(require_roles("admin", "moderator", "organization")),
+):
+    check_own_organization(org_id, token)
+    if not heartbeats.record(org_id, payload.device_ids):
+        raise HTTPException(status_code=503, detail="Heartbeat buffer is full for this organization, try again later")
+    return DeviceHeartbeatAccepted(accepted=len(payload.device_ids))
+
+@router.get("/{org_id}/devices/presence", response_model=DevicePresence)
+async def device_presence(
+    org_id: int,
+    token: dict = Depends(require_roles("admin", "moderator", "organization")),
+):
+    check_own_organization(org_id, token)
+    online = [
+        DevicePresenceItem(id=device_id, last_heartbeat=datetime.fromtimestamp(seen, timezone.utc))
+        for device_id, seen in presence.online(org_id).items()
+    ]
+    return DevicePresence(organization_id=org_id, online_seconds=presence.online_seconds, online_count=len(online), devices=online)
@@ -0,0 +1,55 @@
+from datetime import date
+from typing import Callable, Optional, Sequence
+from fastapi import Response
+from sqlalchemy import select
+from app.db.models.payment import Payment
+from app.db import balances, rollups
+from app.schemas.payment import PaymentCreate, PaymentOut, PaymentListResponse, RevenueAnalyticsResponse
+from app.api.pagination import ListPage, PageParams
+from app.api.filters import filter_payments
+from app.api.export import PAYMENT_COLUMNS, RowEncoder, export_response
+
+
+def list_page(
+    organization_id: Optional[int],
+    start_date: Optional[date],
+    end_date: Optional[date],
+    source: Optional[str],
+    params: PageParams,
+) -> ListPage:
+    stmt = filter_payments(select(Payment), organization_id, start_date, end_date, source)
+    return ListPage(stmt, PaymentOut, (Payment.payment_date, Payment.id), (date.fromisoformat, int), params, envelope=PaymentListResponse)
+
+
+def export(
+    organization_id: Optional[int],
+    start_date: Optional[date],
+    end_date: Optional[date],
+    source: Optional[str],
+    format: str,
+    gzip: bool,
+    stream: Callable,
+) -> Response:
+    """``stream`` is ``stream_rows`` or ``stream_rows_async``."""
+    stmt = filter_payments(select(*PAYMENT_COLUMNS), organization_id, start_date, end_date, source).order_by(Payment.payment_date, Payment.id)
+    encoder = RowEncoder([c.key for c in PAYMENT_COLUMNS], format, gzip)
+    return export_response(stream(stmt, encoder), "payments", format, gzip)
+
+
+def new_payment(payload: PaymentCreate) -> tuple[Payment, list]:
+    """The payment and the balance and rollup statements to run with it; clear ``revenue_cache`` on commit."""
+    statements = [
+        balances.record_payment(payload.organization_id, payload.amount),
+        rollups.record_payment(payload.organization_id, payload.payment_date, payload.source, payload.amount),
+    ]
+    return Payment(**payload.model_dump()), statements
+
+
+def analytics_key(filters: tuple) -> tuple:
+    return (filters, date.today())
+
+
+def analytics_response(key: tuple, start_date: Optional[date], end_date: Optional[date], rows: Sequence) -> RevenueAnalyticsResponse:
+    result = RevenueAnalyticsResponse(start_date=start_date, end_date=end_date, **rollups.revenue_breakdown(rows))
+    rollups.revenue_cache.set(key, result)
+    return result
@@ -0,0 +1,40 @@
+from typing import Optional
+from fastapi import APIRouter, Request, Response
+from app.db.models.plan import CustomPlan
+from app.schemas.plan import PlanCreate, PlanUpdate, PlanOut
+from app.core.plan_catalog import plan_catalog
+from app.api.etag import make_etag, check_etag
+from app.api.shared import T, require_found
+
+router = APIRouter()
+
+
+def found(plan: Optional[T]) -> T:
+    """A row or a catalog entry."""
+    return require_found(plan, "Plan not found")
+
+
+def new_plan(payload: PlanCreate) -> CustomPlan:
+    return CustomPlan(**payload.model_dump())
+
+
+def apply_update(plan: CustomPlan, payload: PlanUpdate) -> None:
+    for k, v in payload.model_dump(exclude_unset=True).items():
+        setattr(plan, k, v)
+
+
+# Catalog reads never block, so they run on the event loop rather than the threadpool
+@router.get("", response_model=list[PlanOut])
+async def list_plans(request: Request, response: Response):
+    not_modified = check_etag(request, response, make_etag("plans", plan_catalog.version))
+    if not_modified:
+        return not_modified
+    return plan_catalog.active_plans()
+
+@router.get("/{plan_id}", response_model=PlanOut)
+async def get_plan(plan_id: int, request: Request, response: Response):
+    plan = found(plan_catalog.get(plan_id))
+    not_modified = check_etag(request, response, make_etag("plan", plan_id, plan_catalog.version))
+    if not_modified:
+        return not_modified
+    return plan
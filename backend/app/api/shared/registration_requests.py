@@ -0,0 +1,39 @@
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import Select, select
+from app.db.models.registration_request import RegistrationRequest
+from app.db.models.user import User
+from app.schemas.registration_request import RegistrationApprovePayload
+
+
+def list_statement() -> Select:
+    return select(RegistrationRequest).order_by(RegistrationRequest.id.desc())
+
+
+def request_item(r: RegistrationRequest) -> dict:
+    return {
+        "id": r.id,
+        "full_name": r.full_name,
+        "phone": r.phone,
+        "address": r.address,
+        "status": r.status,
+    }
+
+
+def pending(req: Optional[RegistrationRequest]) -> RegistrationRequest:
+    if not req or req.status != "pending":
+        raise HTTPException(status_code=404, detail="Request not found or not pending")
+    return req
+
+
+def approve(req: RegistrationRequest, payload: RegistrationApprovePayload, password_hash: str) -> User:
+    """Mark the request approved and return the registrator to add for it."""
+    req.status = "approved"
+    return User(
+        full_name=req.full_name,
+        phone=req.phone,
+        password_hash=password_hash,
+        address=req.address,
+        role="registrator",
+        share_percentage=payload.share_percentage,
+    )
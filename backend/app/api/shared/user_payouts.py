@@ -0,0 +1,34 @@
+from datetime import date
+from typing import Optional
+from sqlalchemy import select
+from app.db.models.user_payout import UserPayout
+from app.db import balances
+from app.schemas.user_payout import UserPayoutCreate, UserPayoutOut
+from app.api.pagination import ListPage, PageParams
+from app.api.shared import require_found
+
+
+def list_page(user_id: Optional[int], start_date: Optional[date], end_date: Optional[date], params: PageParams) -> ListPage:
+    stmt = select(UserPayout)
+    if user_id:
+        stmt = stmt.where(UserPayout.user_id == user_id)
+    if start_date:
+        stmt = stmt.where(UserPayout.payout_date >= start_date)
+    if end_date:
+        stmt = stmt.where(UserPayout.payout_date <= end_date)
+    return ListPage(stmt, UserPayoutOut, (UserPayout.payout_date, UserPayout.id), (date.fromisoformat, int), params)
+
+
+def new_payout(payload: UserPayoutCreate) -> tuple[UserPayout, list]:
+    """The payout and the balance statement to run with it."""
+    return UserPayout(**payload.model_dump()), [balances.record_payout(payload.user_id, payload.amount)]
+
+
+def found(payout: Optional[UserPayout]) -> UserPayout:
+    return require_found(payout, "Payout not found")
+
+
+def delete_statements(payout: UserPayout) -> list:
+    if payout.user_id is None:
+        return []
+    return [balances.record_payout(payout.user_id, -payout.amount)]
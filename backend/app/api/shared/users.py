@@ -0,0 +1,51 @@
+from typing import Optional, Sequence
+from sqlalchemy import Select, func, or_, select
+from app.db.models.user import User
+from app.db.balances import balance_item
+from app.schemas.user import UserCreate, UserOut
+from app.schemas.user_payout import UserBalancesResponse
+from app.api.pagination import ListPage, PageParams
+from app.api.search import like_pattern, similarity
+from app.api.shared import require_found
+
+
+def list_page(search: Optional[str], role: Optional[str], rank: bool, params: PageParams) -> ListPage:
+    stmt = select(User)
+    if search:
+        like = like_pattern(search)
+        stmt = stmt.where(or_(func.lower(User.full_name).like(like), User.phone.like(like)))
+    if role:
+        stmt = stmt.where(User.role == role)
+    order_by = (similarity(User.full_name, search).desc(), User.id.desc()) if search and rank else None
+    return ListPage(stmt, UserOut, (User.id,), (int,), params, order_by)
+
+
+def phone_taken(phone: str) -> Select:
+    return select(User.id).where(User.phone == phone).limit(1)
+
+
+def found(user: Optional[User]) -> User:
+    return require_found(user, "User not found")
+
+
+def new_user(payload: UserCreate, password_hash: str) -> User:
+    return User(
+        full_name=payload.full_name,
+        phone=payload.phone,
+        password_hash=password_hash,
+        address=payload.address,
+        role=payload.role,
+        share_percentage=payload.share_percentage,
+    )
+
+
+def apply_update(user: User, update_data: dict, password_hash: Optional[str]) -> None:
+    """``update_data`` without the password, which ``pop_password`` took out."""
+    if password_hash:
+        user.password_hash = password_hash
+    for field, value in update_data.items():
+        setattr(user, field, value)
+
+
+def balances_response(rows: Sequence, page: int, size: int) -> UserBalancesResponse:
+    return UserBalancesResponse(users=[balance_item(r) for r in rows], page=page, size=size)
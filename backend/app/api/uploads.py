@@ -0,0 +1,104 @@
+"""Streaming CSV/NDJSON request bodies for the bulk import endpoints.
+
+The body is decoded and split into records as it arrives, so an upload is never
+held in memory whole. Records are validated against a Pydantic schema and
+handed out in batches; rows that fail to parse or validate go straight into the
+``ImportReport``.
+"""
+import codecs
+import csv
+from typing import AsyncIterator, Optional
+import orjson
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+from app.schemas.bulk_import import ImportReport, ImportRowError
+
+MAX_REPORTED_ERRORS = 1000
+
+
+def upload_format(request: Request, format: Optional[str]) -> str:
+    if format:
+        return format
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        return "ndjson"
+    if "csv" in content_type or not content_type:
+        return "csv"
+    raise HTTPException(status_code=415, detail="Upload CSV (text/csv) or NDJSON (application/x-ndjson)")
+
+
+def add_error(report: ImportReport, row: int, errors: list[str]) -> None:
+    report.failed += 1
+    if len(report.errors) < MAX_REPORTED_ERRORS:
+        report.errors.append(ImportRowError(row=row, errors=errors))
+
+
+async def _lines(request: Request) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    tail = ""
+    async for chunk in request.stream():
+        tail += decoder.decode(chunk)
+        *lines, tail = tail.split("\n")
+        for line in lines:
+            yield line + "\n"
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def _csv_records(request: Request) -> AsyncIterator[dict]:
+    header = None
+    record = ""
+    async for line in _lines(request):
+        record += line
+        # An odd number of quotes means a quoted field continues on the next line
+        if record.count('"') % 2:
+            continue
+        values = next(csv.reader([record]), [])
+        record = ""
+        if not any(v.strip() for v in values):
+            continue
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+        # Empty cells fall back to the schema defaults
+        yield {k: v for k, v in zip(header, values) if v != ""}
+    if record.strip():
+        yield {k: v for k, v in zip(header or [], next(csv.reader([record]), [])) if v != ""}
+
+
+async def _ndjson_records(request: Request) -> AsyncIterator[object]:
+    async for line in _lines(request):
+        if not line.strip():
+            continue
+        try:
+            yield orjson.loads(line)
+        except orjson.JSONDecodeError:
+            yield None
+
+
+async def read_batches(
+    request: Request,
+    format: str,
+    schema: type[BaseModel],
+    report: ImportReport,
+    batch_size: int,
+) -> AsyncIterator[list[tuple[int, BaseModel]]]:
+    records = _csv_records(request) if format == "csv" else _ndjson_records(request)
+    batch = []
+    async for record in records:
+        report.received += 1
+        row = report.received
+        if not isinstance(record, dict):
+            add_error(report, row, ["Row is not a valid JSON object"])
+            continue
+        try:
+            batch.append((row, schema.model_validate(record)))
+        except ValidationError as exc:
+            add_error(report, row, [f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors()])
+            continue
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
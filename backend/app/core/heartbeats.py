@@ -0,0 +1,163 @@
+"""Write-behind device heartbeats.
+
+The heartbeat endpoint only records ``(organization_id, device_id) -> time`` in
+this worker's buffer; repeated heartbeats from a device coalesce into one entry.
+Entries are kept per organization and capped per organization, so ids reported
+by one organization never replace or crowd out another organization's.
+A background task swaps the buffer out every ``HEARTBEAT_FLUSH_SECONDS`` and
+writes it with a few ``UPDATE devices ... FROM unnest(...)`` statements in one
+transaction. Heartbeat times are sent as ages relative to the flush, so
+``last_seen`` stays on the database clock like its ``now()`` default.
+
+Only devices the flush matched to their organization are then marked online in
+the presence index, so unknown or foreign ids never show up as online.
+"""
+import asyncio
+from threading import Lock
+from time import monotonic, time
+from typing import Optional, Sequence
+from loguru import logger
+from sqlalchemy import Float, Integer, String, Update, bindparam, column, func, literal_column, or_, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.presence import presence
+from app.db.models.branch import Branch
+from app.db.models.device import Device
+
+FLUSH_CHUNK_SIZE = 5000
+
+
+def _last_seen_statement() -> Update:
+    """Parameters are parallel ``device_ids``/``organization_ids``/``ages`` arrays.
+
+    Devices that do not belong to the reported organization are skipped, and
+    ``updated_at`` is left alone so device ETags do not change on every heartbeat.
+    Returns the ``(device_id, organization_id)`` of every updated device.
+    """
+    beats = (
+        func.unnest(
+            bindparam("device_ids", type_=ARRAY(String)),
+            bindparam("organization_ids", type_=ARRAY(Integer)),
+            bindparam("ages", type_=ARRAY(Float)),
+        )
+        .table_valued(column("device_id", String), column("organization_id", Integer), column("age", Float))
+        .render_derived(name="beats")
+    )
+    seen = func.now() - beats.c.age * literal_column("interval '1 second'")
+    return (
+        update(Device)
+        .where(
+            Device.id == beats.c.device_id,
+            Device.branch_id == Branch.id,
+            Branch.organization_id == beats.c.organization_id,
+            or_(Device.last_seen.is_(None), Device.last_seen < seen),
+        )
+        .values(last_seen=seen, updated_at=Device.updated_at)
+        .returning(Device.id, beats.c.organization_id)
+    )
+
+
+# Built once so the compiled SQL is cached; array parameters keep it the same size for any batch
+last_seen_statement = _last_seen_statement()
+
+
+class HeartbeatBuffer:
+    def __init__(self, max_devices: int) -> None:
+        self.max_devices = max_devices
+        self.flushed = 0
+        self.rejected = 0
+        self._pending: dict[int, dict[str, float]] = {}
+        self._lock = Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, organization_id: int, device_ids: Sequence[str]) -> bool:
+        """Buffer heartbeats; False when the organization's share is full until the next flush."""
+        now = monotonic()
+        ids = set(device_ids)
+        with self._lock:
+            devices = self._pending.get(organization_id, {})
+            new = len(ids.difference(devices))
+            if len(devices) + new > self.max_devices:
+                self.rejected += len(ids)
+                return False
+            devices = self._pending.setdefault(organization_id, devices)
+            for device_id in ids:
+                devices[device_id] = now
+        return True
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(devices) for devices in self._pending.values())
+
+    def flush(self) -> int:
+        from app.db.session import engine
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        now = monotonic()
+        device_ids, organization_ids, ages = [], [], []
+        for organization_id, devices in pending.items():
+            for device_id, seen in devices.items():
+                device_ids.append(device_id)
+                organization_ids.append(organization_id)
+                ages.append(now - seen)
+        matched = []
+        try:
+            with engine.begin() as conn:
+                for start in range(0, len(device_ids), FLUSH_CHUNK_SIZE):
+                    end = start + FLUSH_CHUNK_SIZE
+                    matched += conn.execute(
+                        last_seen_statement,
+                        {"device_ids": device_ids[start:end], "organization_ids": organization_ids[start:end], "ages": ages[start:end]},
+                    ).all()
+        except Exception:
+            # Put the batch back unless a newer heartbeat arrived meanwhile
+            with self._lock:
+                for organization_id, devices in pending.items():
+                    current = self._pending.setdefault(organization_id, {})
+                    for device_id, seen in devices.items():
+                        current.setdefault(device_id, seen)
+            raise
+        self.flushed += len(device_ids)
+        self._mark_online(pending, matched, time() - now)
+        return len(device_ids)
+
+    @staticmethod
+    def _mark_online(pending: dict[int, dict[str, float]], matched: Sequence, clock_offset: float) -> None:
+        """Record matched devices in the presence index at their heartbeat's unix time."""
+        online: dict[int, list[tuple[float, str]]] = {}
+        for device_id, organization_id in matched:
+            online.setdefault(organization_id, []).append((pending[organization_id][device_id] + clock_offset, device_id))
+        for organization_id, beats in online.items():
+            presence.record(organization_id, [(device_id, seen) for seen, device_id in sorted(beats)])
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.heartbeat_flush_seconds)
+            try:
+                await run_in_threadpool(self.flush)
+            except Exception:
+                logger.exception("Heartbeat flush failed")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await run_in_threadpool(self.flush)
+        except Exception:
+            logger.exception("Final heartbeat flush failed")
+
+
+heartbeats = HeartbeatBuffer(settings.heartbeat_buffer_max_devices)
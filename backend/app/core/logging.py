@@ -1,19 +1,212 @@
+"""Logging setup.
+
+Everything goes through loguru into ``log_writer``: the calling thread only
+formats the line and puts it on an in-process queue, and a background thread
+does the blocking writes to stdout in batches. (loguru's own ``enqueue=True``
+pickles every record into a multiprocessing pipe from the calling thread.)
+``LOG_FORMAT=json`` renders one compact JSON object per line with the bound
+extras (``request_id``, access-log fields) as top-level keys.
+
+``RequestContextMiddleware`` gives every request an id (the client's
+``X-Request-ID`` when it looks sane, otherwise a new one), binds it to all log
+records written while serving the request, returns it as ``X-Request-ID`` and
+writes the access log line in place of uvicorn's. Unhandled errors are logged
+here, so their traceback carries the id, and re-raised for Starlette's
+ServerErrorMiddleware to answer with the 500 from ``error_handlers``. Routes
+listed in ``ACCESS_LOG_SAMPLE`` only log that fraction of their successful
+requests.
+"""
+import atexit
+import itertools
 import logging
-from loguru import logger
+import re
 import sys
+import traceback
+from queue import Empty, SimpleQueue
+from random import random
+from threading import Thread
+from time import perf_counter
+from typing import Optional, TextIO
+from uuid import uuid4
+import orjson
+from loguru import logger
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from app.core.config import settings
 
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+# Random per-process prefix plus a counter: unique without a urandom call per request
+_request_id_prefix = uuid4().hex[:12]
+_request_counter = itertools.count(1)
+
+
+class BackgroundWriter:
+    """File-like loguru sink that never blocks the caller.
+
+    Lines beyond ``max_pending`` waiting for the writer thread are dropped and
+    counted, so a stalled stdout cannot hold up requests; so are lines a closed
+    or broken stream refuses, which would otherwise end the thread.
+    """
+
+    def __init__(self, stream: TextIO, max_pending: int = 10_000) -> None:
+        self.stream = stream
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._queue: SimpleQueue = SimpleQueue()
+        self._thread: Optional[Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def write(self, message: str) -> None:
+        if self._queue.qsize() >= self.max_pending:
+            self.dropped += 1
+            return
+        self._queue.put(message)
+
+    def _run(self) -> None:
+        while True:
+            lines = [self._queue.get()]
+            while True:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except Empty:
+                    break
+            stop = None in lines
+            text = [line for line in lines if line is not None]
+            try:
+                self.stream.write("".join(text))
+                self.stream.flush()
+            except (OSError, ValueError):
+                # Closed or broken stream (e.g. stdout at interpreter shutdown): nothing left to report to
+                self.dropped += len(text)
+            if stop:
+                return
+
+    def stop(self) -> None:
+        """Write out everything queued so far; loguru calls this when the sink is removed."""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout=5)
+
+
+log_writer = BackgroundWriter(sys.stdout)
+
+
 class InterceptHandler(logging.Handler):
+    """Forwards stdlib records to loguru with the stdlib record's location instead of walking frames."""
+
     def emit(self, record: logging.LogRecord) -> None:
         try:
             level = logger.level(record.levelname).name
         except ValueError:
             level = record.levelno
-        logger.opt(depth=6, exception=record.exc_info).log(level, record.getMessage())
+        logger.patch(lambda r: r.update(name=record.name, function=record.funcName, line=record.lineno)).opt(
+            exception=record.exc_info
+        ).log(level, record.getMessage())
+
+
+def _json_format(record: dict) -> str:
+    payload = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "logger": record["name"],
+        "message": record["message"],
+        **record["extra"],
+    }
+    if record["exception"] is not None:
+        payload["exception"] = "".join(traceback.format_exception(*record["exception"]))
+    record["extra"]["_json"] = orjson.dumps(payload, default=str).decode()
+    return "{extra[_json]}\n"
+
+
+def parse_access_log_sample(spec: str) -> dict[str, float]:
+    """Parse ``"/health=0.01,/metrics=0"`` into route template -> fraction logged."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        route, _, rate = item.partition("=")
+        try:
+            rates[route.strip()] = float(rate)
+        except ValueError:
+            raise ValueError(f"Invalid access log sample rate: {item!r}") from None
+    return rates
+
 
 def configure_logging() -> None:
     logging.getLogger().handlers = [InterceptHandler()]
-    for name in ("uvicorn", "uvicorn.access", "uvicorn.error"):
+    for name in ("uvicorn", "uvicorn.error"):
         logging.getLogger(name).handlers = [InterceptHandler()]
+    # RequestContextMiddleware writes the access log
+    access = logging.getLogger("uvicorn.access")
+    access.handlers = []
+    access.propagate = False
+    access.disabled = True
     logger.remove()
-    logger.add(sys.stdout, level=settings.log_level, serialize=False, backtrace=True, diagnose=False)
\ No newline at end of file
+    log_writer.start()
+    if settings.log_format == "json":
+        logger.add(log_writer, level=settings.log_level, format=_json_format, backtrace=False, diagnose=False)
+    else:
+        logger.add(log_writer, level=settings.log_level, backtrace=True, diagnose=False)
+
+
+class RequestContextMiddleware:
+    def __init__(self, app: ASGIApp, access_log: bool = True, sample_rates: Optional[dict[str, float]] = None) -> None:
+        self.app = app
+        self.access_log = access_log
+        self.sample_rates = sample_rates or {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        if not request_id or not _REQUEST_ID.match(request_id):
+            request_id = f"{_request_id_prefix}-{next(_request_counter):x}"
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("X-Request-ID", request_id)
+            await send(message)
+
+        start = perf_counter()
+        with logger.contextualize(request_id=request_id):
+            try:
+                await self.app(scope, receive, send_wrapper)
+            except Exception:
+                # Logged here so the traceback carries the request id
+                logger.exception("Unhandled error in {} {}", scope["method"], scope["path"])
+                raise
+            finally:
+                if self.access_log:
+                    self._log_access(scope, status, perf_counter() - start)
+
+    def _log_access(self, scope: Scope, status: int, seconds: float) -> None:
+        route = scope.get("route")
+        template = route.path if route else None
+        rate = self.sample_rates.get(template, 1.0) if template else 1.0
+        if status < 400 and rate < 1.0 and random() >= rate:
+            return
+        fields = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": template,
+            "status": status,
+            "duration_ms": round(seconds * 1000, 2),
+            "client": scope["client"][0] if scope.get("client") else None,
+        }
+        stats = scope.get("query_stats")
+        if stats is not None:
+            fields["db_queries"] = stats.count
+            fields["db_time_ms"] = round(stats.seconds * 1000, 2)
+        logger.bind(access=True, **fields).info("{} {} {} {:.1f}ms", scope["method"], scope["path"], status, seconds * 1000)
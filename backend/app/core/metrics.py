@@ -0,0 +1,164 @@
+from bisect import bisect_left
+from threading import Lock
+from time import perf_counter
+from typing import Iterable, Optional, Sequence
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram; bucket bounds are inclusive upper limits in seconds."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        cumulative += counts[-1]
+        buckets["+Inf"] = cumulative
+        return {"buckets": buckets, "count": cumulative, "sum": total}
+
+
+class LoopHistogram(Histogram):
+    """Histogram only written from the event loop thread, so ``observe`` skips the lock."""
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect_left(self.buckets, value)] += 1
+        self._sum += value
+
+
+class Counter:
+    def __init__(self) -> None:
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+
+class RequestMetrics:
+    """Per-route request latency, keyed by (method, route template, status).
+
+    Only the event loop touches ``in_flight`` and the series, so the
+    middleware path is a dict lookup plus a lock-free ``LoopHistogram.observe``.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.in_flight = 0
+        self._series: dict[tuple[str, str, int], LoopHistogram] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float) -> None:
+        key = (method, route, status)
+        histogram = self._series.get(key)
+        if histogram is None:
+            histogram = self._series[key] = LoopHistogram(self.buckets)
+        histogram.observe(seconds)
+
+    def series(self) -> list[tuple[tuple[str, str, int], LoopHistogram]]:
+        return list(self._series.items())
+
+
+class Exposition:
+    """Builds a Prometheus text-format (0.0.4) page."""
+
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self) -> None:
+        self._lines: list[str] = []
+
+    def _header(self, name: str, kind: str, help: str) -> None:
+        self._lines.append(f"# HELP {name} {help}")
+        self._lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, kind: str, help: str, value: float, labels: Optional[dict] = None) -> None:
+        self.samples(name, kind, help, [(labels or {}, value)])
+
+    def samples(self, name: str, kind: str, help: str, samples: Iterable[tuple[dict, float]]) -> None:
+        self._header(name, kind, help)
+        for labels, value in samples:
+            self._lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    def histograms(self, name: str, help: str, series: Iterable[tuple[dict, Histogram]]) -> None:
+        self._header(name, "histogram", help)
+        for labels, histogram in series:
+            snapshot = histogram.snapshot()
+            for bound, count in snapshot["buckets"].items():
+                self._lines.append(f"{name}_bucket{_format_labels({**labels, 'le': bound})} {count}")
+            self._lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(snapshot['sum'])}")
+            self._lines.append(f"{name}_count{_format_labels(labels)} {snapshot['count']}")
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsMiddleware:
+    """Records in-flight requests and latency per route template and status.
+
+    Sits just inside RequestContextMiddleware and outside the rate limiter,
+    so rate-limited and failed requests are counted too, while the latency
+    leaves out the access log; the route is read from the scope after
+    routing, and requests that never matched a route share the ``unmatched``
+    label.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: RequestMetrics) -> None:
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics = self.metrics
+        metrics.in_flight += 1
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_flight -= 1
+            route = scope.get("route")
+            metrics.observe(scope["method"], route.path if route else "unmatched", status, perf_counter() - start)
+
+
+request_metrics = RequestMetrics()
+rate_limit_rejections = Counter()
\ No newline at end of file
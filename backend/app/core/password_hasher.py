@@ -0,0 +1,91 @@
+"""bcrypt off the request path.
+
+Hashing and verification run in a small dedicated process pool, so a login
+burst occupies those processes instead of the threadpool and the GIL. Calls
+beyond ``password_hash_max_pending`` running or queued fail fast with
+``PasswordHasherBusy`` (served as 503) rather than piling up.
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from threading import Lock
+from typing import Callable, Optional, Sequence, Tuple
+from app.core.config import settings
+from app.core.security import get_password_hash, verify_and_update_password
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: children must not inherit the parent's database connections
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        self.start()
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy()
+            self.pending += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _: Optional[Future]) -> None:
+        with self._lock:
+            self.pending -= 1
+
+    def hash(self, password: str) -> str:
+        return self._submit(get_password_hash, password).result()
+
+    def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Returns (valid, new_hash); new_hash is set when the stored hash needs rehashing."""
+        return self._submit(verify_and_update_password, password, hashed).result()
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(get_password_hash, password))
+
+    async def hash_many_async(self, passwords: Sequence[str]) -> list[str]:
+        """Hash a batch for bulk imports.
+
+        At most ``workers`` hashes of the batch are in flight at once, so
+        interactive calls wait behind one hash at most. The batch bypasses the
+        pending limit, so an import is never cut short by a 503.
+        """
+        self.start()
+        semaphore = asyncio.Semaphore(self.workers)
+
+        async def one(password: str) -> str:
+            async with semaphore:
+                return await asyncio.wrap_future(self._executor.submit(get_password_hash, password))
+
+        return await asyncio.gather(*(one(p) for p in passwords))
+
+    async def verify_async(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        return await asyncio.wrap_future(self._submit(verify_and_update_password, password, hashed))
+
+
+password_hasher = PasswordHasher(settings.password_hash_workers, settings.password_hash_max_pending)
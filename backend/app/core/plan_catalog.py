@@ -0,0 +1,102 @@
+"""In-memory plan catalog.
+
+``list_plans``/``get_plan`` are served from this catalog without opening a
+session. Plan writes bump the ``plans`` row in ``catalog_versions`` in the same
+transaction and reload the catalog of the worker that made them; every worker
+also polls that version in the background and reloads when it moves.
+"""
+import asyncio
+from threading import Lock
+from typing import Optional, Sequence
+from loguru import logger
+from sqlalchemy import Insert, Select, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.db.models.catalog_version import CatalogVersion
+from app.db.models.plan import CustomPlan
+from app.schemas.plan import PlanOut
+
+CATALOG_NAME = "plans"
+
+
+def version_statement() -> Select:
+    return select(CatalogVersion.version).where(CatalogVersion.name == CATALOG_NAME)
+
+
+def bump_version_statement() -> Insert:
+    stmt = pg_insert(CatalogVersion).values(name=CATALOG_NAME, version=1)
+    return stmt.on_conflict_do_update(
+        index_elements=[CatalogVersion.name],
+        set_={"version": CatalogVersion.version + 1},
+    )
+
+
+def plans_statement() -> Select:
+    return select(CustomPlan).order_by(CustomPlan.id.asc())
+
+
+class PlanCatalog:
+    def __init__(self) -> None:
+        self.version: Optional[int] = None
+        self._plans: dict[int, PlanOut] = {}
+        self._active: list[PlanOut] = []
+        self._lock = Lock()
+        self._watcher: Optional[asyncio.Task] = None
+
+    def replace(self, version: Optional[int], plans: Sequence[CustomPlan]) -> None:
+        items = [PlanOut.model_validate(p) for p in plans]
+        with self._lock:
+            self.version = version or 0
+            self._plans = {p.id: p for p in items}
+            self._active = [p for p in items if p.is_active]
+
+    def active_plans(self) -> list[PlanOut]:
+        return self._active
+
+    def get(self, plan_id: int) -> Optional[PlanOut]:
+        return self._plans.get(plan_id)
+
+    def load(self, db: Session) -> None:
+        version = db.scalar(version_statement())
+        self.replace(version, db.scalars(plans_statement()).all())
+
+    async def load_async(self, db: AsyncSession) -> None:
+        version = await db.scalar(version_statement())
+        self.replace(version, (await db.scalars(plans_statement())).all())
+
+    def refresh_if_stale(self) -> None:
+        from app.db.session import SessionLocal
+
+        db = SessionLocal()
+        try:
+            if (db.scalar(version_statement()) or 0) != self.version:
+                self.load(db)
+        finally:
+            db.close()
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(settings.plan_catalog_check_seconds)
+            try:
+                await run_in_threadpool(self.refresh_if_stale)
+            except Exception:
+                logger.exception("Plan catalog refresh failed")
+
+    def start_watcher(self) -> None:
+        if self._watcher is None:
+            self._watcher = asyncio.get_running_loop().create_task(self._watch())
+
+    async def stop_watcher(self) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+
+
+plan_catalog = PlanCatalog()
@@ -0,0 +1,72 @@
+"""In-memory device presence.
+
+The heartbeat buffer records devices here once its flush has matched them to
+their organization, so the presence endpoint answers "online now" without
+reading ``devices.last_seen`` and never lists ids the organization does not
+own. A device therefore shows up at most ``HEARTBEAT_FLUSH_SECONDS`` after its
+heartbeat. Each organization keeps its devices in heartbeat order, up to
+``PRESENCE_MAX_DEVICES`` each; entries older than ``PRESENCE_ONLINE_SECONDS``
+are dropped from the front on access, which keeps online counts O(expired).
+Like the heartbeat buffer the index is per worker, so it is complete only when
+heartbeats reach a single worker.
+"""
+from collections import OrderedDict
+from threading import Lock
+from time import time
+from typing import Sequence
+from app.core.config import settings
+
+
+class PresenceIndex:
+    def __init__(self, online_seconds: float, max_devices: int) -> None:
+        self.online_seconds = online_seconds
+        self.max_devices = max_devices
+        self._orgs: dict[int, OrderedDict[str, float]] = {}
+        self._lock = Lock()
+
+    def _expire(self, organization_id: int, devices: OrderedDict, now: float) -> None:
+        cutoff = now - self.online_seconds
+        while devices:
+            device_id, seen = next(iter(devices.items()))
+            if seen >= cutoff:
+                break
+            del devices[device_id]
+        if not devices:
+            del self._orgs[organization_id]
+
+    def record(self, organization_id: int, beats: Sequence[tuple[str, float]]) -> None:
+        """Mark ``(device_id, unix time)`` beats online, oldest first.
+
+        New devices are skipped while the organization is full of live entries.
+        """
+        with self._lock:
+            devices = self._orgs.setdefault(organization_id, OrderedDict())
+            for device_id, seen in beats:
+                if device_id in devices:
+                    if devices[device_id] >= seen:
+                        continue
+                    devices.move_to_end(device_id)
+                elif len(devices) >= self.max_devices:
+                    self._expire(organization_id, devices, time())
+                    devices = self._orgs.setdefault(organization_id, devices)
+                    if len(devices) >= self.max_devices:
+                        break
+                devices[device_id] = seen
+            if not devices:
+                del self._orgs[organization_id]
+
+    def online(self, organization_id: int) -> dict[str, float]:
+        """Device id -> last heartbeat (unix time) for devices seen within the online window."""
+        with self._lock:
+            devices = self._orgs.get(organization_id)
+            if devices is None:
+                return {}
+            self._expire(organization_id, devices, time())
+            return dict(devices)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(devices) for devices in self._orgs.values())
+
+
+presence = PresenceIndex(settings.presence_online_seconds, settings.presence_max_devices)
@@ -1,23 +1,288 @@
-from time import time
-from typing import Callable
-from starlette.requests import Request
+from collections import OrderedDict
+from dataclasses import dataclass
+from math import floor
+from time import monotonic, time
+from typing import Optional, Protocol, Sequence
+from jose import JWTError
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
 from starlette.responses import JSONResponse
-from starlette.types import ASGIApp
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.metrics import rate_limit_rejections
+from app.core.security import decode_token_cached
+
+
+class SlidingWindowLimiter:
+    """Sliding-window-counter rate limiter with O(1) cost per request.
+
+    Each key keeps the request count of the current and previous fixed window;
+    the previous count is weighted by how much of it still overlaps the sliding
+    window. Keys are kept in least-recently-seen order: idle keys are swept from
+    the front once per window and the number of tracked keys never exceeds
+    ``max_keys``. Not thread-safe; it is only called from the event loop.
+    """
+
+    def __init__(self, max_requests: int, window_seconds: float = 60, max_keys: int = 100_000) -> None:
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        # key -> [window_index, current_count, previous_count]
+        self._windows: "OrderedDict[str, list]" = OrderedDict()
+        self._swept_window = 0
+
+    def allow(self, key: str, now: Optional[float] = None) -> bool:
+        now = time() if now is None else now
+        position = now / self.window_seconds
+        window = floor(position)
+        if window != self._swept_window:
+            self._evict_idle(window)
+        windows = self._windows
+        state = windows.get(key)
+        if state is None:
+            state = windows[key] = [window, 0, 0]
+            if len(windows) > self.max_keys:
+                windows.popitem(last=False)
+        else:
+            windows.move_to_end(key)
+            if state[0] != window:
+                # Counts older than the previous window no longer overlap at all
+                state[2] = state[1] if state[0] == window - 1 else 0
+                state[1] = 0
+                state[0] = window
+        if state[2] * (1 - (position - window)) + state[1] >= self.max_requests:
+            return False
+        state[1] += 1
+        return True
+
+    def _evict_idle(self, window: int) -> None:
+        # Keys last seen before the previous window count nothing; they sit at
+        # the front of the LRU order, so the sweep stops at the first live key.
+        self._swept_window = window
+        windows = self._windows
+        while windows:
+            state = windows[next(iter(windows))]
+            if state[0] >= window - 1:
+                break
+            windows.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    key: str
+    limit: int
+    window_seconds: float
+
+
+@dataclass(frozen=True)
+class RouteLimit:
+    method: Optional[str]
+    path_prefix: str
+    limit: int
+
+    def matches(self, method: str, path: str) -> bool:
+        return (self.method is None or self.method == method) and path.startswith(self.path_prefix)
+
+
+def parse_route_limits(spec: str) -> list[RouteLimit]:
+    """Parse ``"POST /api/auth/login=10,/api/payments/analytics=30"``."""
+    rules = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        target, _, limit = item.rpartition("=")
+        method, _, path = target.strip().rpartition(" ")
+        if not path.startswith("/") or not limit.strip().isdigit():
+            raise ValueError(f"Invalid route rate limit: {item!r}")
+        rules.append(RouteLimit(method.strip().upper() or None, path, int(limit)))
+    # Longest prefix first so the most specific rule wins
+    return sorted(rules, key=lambda r: len(r.path_prefix), reverse=True)
+
+
+def parse_role_limits(spec: str) -> dict[str, int]:
+    """Parse ``"admin=1000,registrator=300"``."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        role, _, limit = item.partition("=")
+        if not role.strip() or not limit.strip().isdigit():
+            raise ValueError(f"Invalid role rate limit: {item!r}")
+        limits[role.strip()] = int(limit)
+    return limits
+
+
+class RateLimitBackend(Protocol):
+    async def hit(self, limits: Sequence[RateLimit]) -> bool:
+        """Count one request against every limit; False if any of them is exhausted."""
+
+    async def close(self) -> None:
+        ...
+
+
+class MemoryRateLimitBackend:
+    """Per-process counters. Each worker enforces its limits independently."""
+
+    def __init__(self, max_keys: int = 100_000) -> None:
+        self.max_keys = max_keys
+        self._limiters: dict[tuple[int, float], SlidingWindowLimiter] = {}
+
+    def allow(self, limit: RateLimit, now: Optional[float] = None) -> bool:
+        limiter = self._limiters.get((limit.limit, limit.window_seconds))
+        if limiter is None:
+            limiter = SlidingWindowLimiter(limit.limit, limit.window_seconds, self.max_keys)
+            self._limiters[(limit.limit, limit.window_seconds)] = limiter
+        return limiter.allow(limit.key, now)
+
+    async def hit(self, limits: Sequence[RateLimit]) -> bool:
+        now = time()
+        allowed = True
+        for limit in limits:
+            allowed = self.allow(limit, now) and allowed
+        return allowed
+
+    async def close(self) -> None:
+        pass
+
+
+# KEYS: current window counter, previous window counter
+# ARGV: limit, counter ttl in ms, elapsed fraction of the current window
+SLIDING_WINDOW_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * (1 - tonumber(ARGV[3])) + current >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('INCR', KEYS[1])
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+class RedisRateLimitBackend:
+    """Counters shared by every worker and replica through Redis.
+
+    Each limit is checked and incremented atomically by a Lua script; all limits
+    of one request go out in a single pipeline, so a request costs one round
+    trip. Any client speaking the ``redis.asyncio`` API works, including a local
+    stand-in such as ``fakeredis.aioredis.FakeRedis``. While Redis is unreachable
+    the per-process ``fallback`` enforces the limits instead.
+    """
+
+    def __init__(
+        self,
+        client: Redis,
+        prefix: str = "ratelimit:",
+        fallback: Optional[MemoryRateLimitBackend] = None,
+        retry_after_seconds: float = 5,
+    ) -> None:
+        self.client = client
+        self.prefix = prefix
+        self.fallback = fallback or MemoryRateLimitBackend()
+        self.retry_after_seconds = retry_after_seconds
+        self._script = client.register_script(SLIDING_WINDOW_SCRIPT)
+        self._unavailable_until = 0.0
+
+    async def hit(self, limits: Sequence[RateLimit]) -> bool:
+        if monotonic() < self._unavailable_until:
+            return await self.fallback.hit(limits)
+        now = time()
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for limit in limits:
+                    position = now / limit.window_seconds
+                    window = floor(position)
+                    # Hash tag keeps both windows of a key in one Redis Cluster slot
+                    key = f"{self.prefix}{{{limit.key}}}:{limit.window_seconds:g}"
+                    await self._script(
+                        keys=[f"{key}:{window}", f"{key}:{window - 1}"],
+                        args=[limit.limit, int(limit.window_seconds * 2000), position - window],
+                        client=pipe,
+                    )
+                results = await pipe.execute()
+        except (RedisError, OSError) as exc:
+            logger.warning("Rate limit backend unavailable ({}), using per-process limits for {}s", exc, self.retry_after_seconds)
+            self._unavailable_until = monotonic() + self.retry_after_seconds
+            return await self.fallback.hit(limits)
+        return all(int(r) == 1 for r in results)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def create_rate_limit_backend(settings) -> RateLimitBackend:
+    if settings.rate_limit_backend == "redis":
+        return RedisRateLimitBackend(
+            Redis.from_url(settings.redis_url, socket_timeout=settings.rate_limit_redis_timeout_seconds),
+            fallback=MemoryRateLimitBackend(settings.rate_limit_max_tracked_clients),
+        )
+    if settings.rate_limit_backend != "memory":
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {settings.rate_limit_backend!r}")
+    return MemoryRateLimitBackend(settings.rate_limit_max_tracked_clients)
+
 
 class RateLimiterMiddleware:
-    def __init__(self, max_requests_per_minute: int = 100) -> None:
+    """ASGI middleware enforcing a per-client limit plus optional per-route limits.
+
+    Clients with a valid bearer token are counted by user and get their role's
+    limit; everyone else is counted by IP address with the default limit.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_requests_per_minute: int = 100,
+        max_tracked_clients: int = 100_000,
+        backend: Optional[RateLimitBackend] = None,
+        window_seconds: float = 60,
+        route_limits: Sequence[RouteLimit] = (),
+        role_limits: Optional[dict[str, int]] = None,
+    ) -> None:
+        self.app = app
         self.max_requests = max_requests_per_minute
-        self.window_seconds = 60
-        self._buckets: dict[str, list[float]] = {}
+        self.window_seconds = window_seconds
+        self.backend = backend or MemoryRateLimitBackend(max_tracked_clients)
+        self.route_limits = list(route_limits)
+        self.role_limits = role_limits or {}
 
-    async def __call__(self, request: Request, call_next: Callable):
-        client_ip = request.client.host if request.client else "unknown"
-        now = time()
-        bucket = self._buckets.setdefault(client_ip, [])
-        threshold = now - self.window_seconds
-        while bucket and bucket[0] < threshold:
-            bucket.pop(0)
-        if len(bucket) >= self.max_requests:
-            return JSONResponse(status_code=429, content={"error": {"code": "RATE_LIMIT_EXCEEDED", "message": "Too many requests"}})
-        bucket.append(now)
-        return await call_next(request)
\ No newline at end of file
+    def limits_for(self, scope: Scope) -> list[RateLimit]:
+        client, role = _client_identity(scope)
+        limit = self.role_limits.get(role, self.max_requests) if role else self.max_requests
+        limits = [RateLimit(client, limit, self.window_seconds)]
+        for rule in self.route_limits:
+            if rule.matches(scope["method"], scope["path"]):
+                rule_key = f"{rule.method or '*'} {rule.path_prefix}"
+                limits.append(RateLimit(f"{client}|{rule_key}", rule.limit, self.window_seconds))
+                break
+        return limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if not await self.backend.hit(self.limits_for(scope)):
+            rate_limit_rejections.inc()
+            response = JSONResponse(status_code=429, content={"error": {"code": "RATE_LIMIT_EXCEEDED", "message": "Too many requests"}})
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+def _client_identity(scope: Scope) -> tuple[str, Optional[str]]:
+    authorization = ""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            authorization = value.decode("latin-1")
+            break
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            payload = decode_token_cached(token)
+        except JWTError:
+            payload = {}
+        if payload.get("sub"):
+            role = payload.get("role")
+            # Organization and user ids share a numeric space
+            kind = "org" if role == "organization" else "user"
+            return f"{kind}:{payload['sub']}", role
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}", None
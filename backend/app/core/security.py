@@ -1,10 +1,20 @@
+import hashlib
 from datetime import datetime, timedelta, timezone
+from time import time
 from jose import jwt
 from passlib.context import CryptContext
+from app.core.cache import TTLCache
 from app.core.config import settings
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Pinning min/max to the configured cost makes verify_and_update flag hashes made with any other cost
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds,
+)
 
 
 def get_password_hash(password: str) -> str:
@@ -15,6 +25,11 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password; on success also return a new hash if the stored one uses another cost."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def create_access_token(subject: str, extra_claims: Optional[Dict[str, Any]] = None) -> str:
     expire = datetime.now(timezone.utc) + timedelta(minutes=settings.access_token_expire_minutes)
     to_encode: Dict[str, Any] = {"sub": subject, "exp": expire}
@@ -30,4 +45,22 @@ def create_refresh_token(subject: str) -> str:
 
 
 def decode_token(token: str) -> Dict[str, Any]:
-    return jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
\ No newline at end of file
+    return jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+
+
+# Verified claims keyed by token digest, so repeated requests with the same token skip signature checks
+token_cache = TTLCache(settings.token_cache_ttl_seconds, settings.token_cache_max_entries)
+
+
+def decode_token_cached(token: str) -> Dict[str, Any]:
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    payload = token_cache.get(key)
+    if payload is None:
+        payload = decode_token(token)
+        ttl = settings.token_cache_ttl_seconds
+        if "exp" in payload:
+            # Never serve a token from the cache past its own expiry
+            ttl = min(ttl, payload["exp"] - time())
+        if ttl > 0:
+            token_cache.set(key, payload, ttl)
+    return dict(payload)
\ No newline at end of file
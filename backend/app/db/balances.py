@@ -0,0 +1,192 @@
+"""Registrator balance ledger.
+
+``user_balances`` keeps running earnings/payout totals per user so balance
+reads are primary-key lookups. Every write that changes a user's earnings or
+payouts executes one of the ledger statements below in the same transaction;
+``rebuild`` and ``verify`` reconcile the ledger with the raw tables::
+
+    python -m app.db.balances verify
+    python -m app.db.balances rebuild
+"""
+import argparse
+import sys
+from decimal import Decimal
+from typing import Optional, Union
+from sqlalchemy import FromClause, Insert, Numeric, Select, delete, func, literal, or_, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.db.models.organization import Organization
+from app.db.models.payment import Payment
+from app.db.models.user import User
+from app.db.models.user_balance import UserBalance
+from app.db.models.user_payout import UserPayout
+
+Amount = Union[Decimal, float]
+
+
+def _upsert(rows: Union[Select, dict]) -> Insert:
+    stmt = pg_insert(UserBalance)
+    if isinstance(rows, dict):
+        stmt = stmt.values(**rows)
+    else:
+        stmt = stmt.from_select(["user_id", "total_earnings", "total_payouts"], rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[UserBalance.user_id],
+        set_={
+            "total_earnings": UserBalance.total_earnings + stmt.excluded.total_earnings,
+            "total_payouts": UserBalance.total_payouts + stmt.excluded.total_payouts,
+            "updated_at": func.now(),
+        },
+    )
+
+
+def record_payment(organization_id: int, amount: Amount) -> Insert:
+    """Credit a new payment to the registrator of its organization, if any.
+
+    The organization row is share-locked so a concurrent registrator change
+    (which takes the row FOR UPDATE) sees this payment or runs after it.
+    """
+    return _upsert(
+        select(Organization.registrator_id, literal(amount, Numeric(14, 2)), literal(0, Numeric(14, 2)))
+        .where(Organization.id == organization_id, Organization.registrator_id.is_not(None))
+        .with_for_update(read=True)
+    )
+
+
+def record_payments(payments: FromClause) -> Insert:
+    """Set-based ``record_payment`` for a selectable with organization_id and amount columns.
+
+    The caller share-locks the organizations involved before running it.
+    """
+    return _upsert(
+        select(Organization.registrator_id, func.sum(payments.c.amount), literal(0, Numeric(14, 2)))
+        .join(payments, payments.c.organization_id == Organization.id)
+        .where(Organization.registrator_id.is_not(None))
+        .group_by(Organization.registrator_id)
+    )
+
+
+def move_organization_earnings(organization_id: int, user_id: int, sign: int) -> Insert:
+    """Add (sign=1) or remove (sign=-1) all of an organization's payments for ``user_id``.
+
+    Used when an organization changes registrator or is deleted.
+    """
+    total = select(func.coalesce(func.sum(Payment.amount), 0)).where(Payment.organization_id == organization_id).scalar_subquery()
+    return _upsert({"user_id": user_id, "total_earnings": total * sign, "total_payouts": 0})
+
+
+def record_payout(user_id: int, amount: Amount) -> Insert:
+    return _upsert({"user_id": user_id, "total_earnings": 0, "total_payouts": amount})
+
+
+def computed_balances() -> Select:
+    """Balances recomputed from payments and user_payouts; the ledger's source of truth."""
+    earnings = (
+        select(Organization.registrator_id.label("user_id"), func.sum(Payment.amount).label("total"))
+        .join(Payment, Payment.organization_id == Organization.id)
+        .group_by(Organization.registrator_id)
+        .subquery("earnings")
+    )
+    payouts = (
+        select(UserPayout.user_id, func.sum(UserPayout.amount).label("total"))
+        .group_by(UserPayout.user_id)
+        .subquery("payouts")
+    )
+    return (
+        select(
+            User.id.label("user_id"),
+            func.coalesce(earnings.c.total, 0).label("total_earnings"),
+            func.coalesce(payouts.c.total, 0).label("total_payouts"),
+        )
+        .outerjoin(earnings, earnings.c.user_id == User.id)
+        .outerjoin(payouts, payouts.c.user_id == User.id)
+    )
+
+
+def user_balances_statement(role: Optional[str], page: int, size: int) -> Select:
+    stmt = (
+        select(
+            User.id,
+            User.full_name,
+            func.coalesce(User.share_percentage, 0).label("share_percentage"),
+            func.coalesce(UserBalance.total_earnings, 0).label("total_earnings"),
+            func.coalesce(UserBalance.total_payouts, 0).label("total_payouts"),
+        )
+        .outerjoin(UserBalance, UserBalance.user_id == User.id)
+    )
+    if role:
+        stmt = stmt.where(User.role == role)
+    return stmt.order_by(User.id.asc()).offset((page - 1) * size).limit(size)
+
+
+def balance_item(row) -> dict:
+    share = float(row.share_percentage)
+    total_earnings = float(row.total_earnings)
+    total_payouts = float(row.total_payouts)
+    return {
+        "id": row.id,
+        "full_name": row.full_name,
+        "share_percentage": share,
+        "total_earnings": total_earnings,
+        "total_payouts": total_payouts,
+        "current_balance": total_earnings * share / 100 - total_payouts,
+    }
+
+
+def rebuild(db: Session) -> int:
+    """Replace the ledger with freshly computed balances. Returns the number of rows written."""
+    # Block payment/payout/registrator writes so no increment lands between the delete and the insert
+    db.execute(text("LOCK TABLE payments, user_payouts, organizations IN SHARE MODE"))
+    db.execute(delete(UserBalance))
+    computed = computed_balances().subquery()
+    result = db.execute(
+        pg_insert(UserBalance).from_select(
+            ["user_id", "total_earnings", "total_payouts"],
+            select(computed.c.user_id, computed.c.total_earnings, computed.c.total_payouts),
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+
+def verify(db: Session) -> list[dict]:
+    """Users whose ledger row disagrees with the raw tables."""
+    computed = computed_balances().subquery()
+    ledger_earnings = func.coalesce(UserBalance.total_earnings, 0)
+    ledger_payouts = func.coalesce(UserBalance.total_payouts, 0)
+    rows = db.execute(
+        select(
+            computed.c.user_id,
+            computed.c.total_earnings,
+            computed.c.total_payouts,
+            ledger_earnings.label("ledger_earnings"),
+            ledger_payouts.label("ledger_payouts"),
+        )
+        .outerjoin(UserBalance, UserBalance.user_id == computed.c.user_id)
+        .where(or_(computed.c.total_earnings != ledger_earnings, computed.c.total_payouts != ledger_payouts))
+    ).all()
+    return [dict(r._mapping) for r in rows]
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    from app.db.session import SessionLocal
+
+    parser = argparse.ArgumentParser(prog="python -m app.db.balances", description="Reconcile the user_balances ledger")
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    args = parser.parse_args(argv)
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            print(f"rebuilt {rebuild(db)} balances")
+            return 0
+        mismatches = verify(db)
+        for m in mismatches:
+            print(m)
+        print(f"{len(mismatches)} mismatched balances")
+        return 1 if mismatches else 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""Bulk loading of organizations and payments.
+
+Each batch is COPYed into a temporary staging table, checked against the live
+tables with set-based statements and merged in one transaction. Rows that
+cannot be merged keep the reason in their ``error`` column and are reported
+back by row number. Payment batches update the balance ledger and the daily
+rollup in the same transaction, like ``create_payment``.
+
+Values that do not fit a staging column (too long, out of range) are rejected
+per row before the COPY, because the database would fail the whole COPY on
+them. Should the database still reject a batch, its COPY and merge roll back
+to a savepoint and every row of the batch is reported as not imported.
+"""
+import csv
+import io
+import math
+from decimal import Decimal
+from typing import Callable, Sequence
+from loguru import logger
+from sqlalchemy import Boolean, Column, Date, Integer, MetaData, Numeric, String, Table, Text, exists, insert, select, update
+from sqlalchemy.exc import DataError, DBAPIError, IntegrityError
+from sqlalchemy.orm import Session
+from app.db import balances, rollups
+from app.db.models.organization import Organization
+from app.db.models.payment import Payment
+from app.db.models.user import User
+
+# Mirrors the payments_source_check constraint so a bad source fails one row, not the batch
+PAYMENT_SOURCES = ("Subscription", "Click", "Payme")
+
+_NULL = r"\N"
+_metadata = MetaData()
+
+organization_staging = Table(
+    "organization_import",
+    _metadata,
+    Column("row_no", Integer, primary_key=True),
+    Column("name", String(255)),
+    Column("phone", String(20)),
+    Column("boss", String(255)),
+    Column("password_hash", String),
+    Column("plan", String(50)),
+    Column("registrator_id", Integer),
+    Column("registration_date", Date),
+    Column("plan_expiration_days", Integer),
+    Column("is_active", Boolean),
+    Column("error", Text),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+payment_staging = Table(
+    "payment_import",
+    _metadata,
+    Column("row_no", Integer, primary_key=True),
+    Column("organization_id", Integer),
+    Column("amount", Numeric(12, 2)),
+    Column("source", String(50)),
+    Column("payment_date", Date),
+    Column("error", Text),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+RowErrors = list[tuple[int, list[str]]]
+
+_INT4_MIN, _INT4_MAX = -2**31, 2**31 - 1
+
+
+def _check_row(table: Table, row: dict) -> list[str]:
+    """Problems the COPY into ``table`` would fail on, phrased like validation errors."""
+    problems = []
+    for column in table.columns:
+        value = row.get(column.name)
+        if value is None:
+            continue
+        kind = column.type
+        if isinstance(value, str):
+            if isinstance(kind, String) and kind.length and len(value) > kind.length:
+                problems.append(f"{column.name}: String should have at most {kind.length} characters")
+            if "\x00" in value:
+                problems.append(f"{column.name}: String should not contain NUL characters")
+        elif isinstance(kind, Numeric) and kind.precision:
+            digits = kind.precision - (kind.scale or 0)
+            if not math.isfinite(value):
+                problems.append(f"{column.name}: Input should be a finite number")
+            # Postgres rounds half away from zero to the column's scale before checking the precision
+            elif abs(Decimal(str(value))) >= Decimal(10) ** digits - Decimal("0.5").scaleb(-(kind.scale or 0)):
+                problems.append(f"{column.name}: Input should be less than 10^{digits} in absolute value")
+        elif isinstance(kind, Integer) and not _INT4_MIN <= value <= _INT4_MAX:
+            problems.append(f"{column.name}: Input should be between {_INT4_MIN} and {_INT4_MAX}")
+    return problems
+
+
+def _copy(db: Session, table: Table, rows: Sequence[dict]) -> None:
+    table.create(db.connection())
+    columns = [c.name for c in table.columns if c.name != "error"]
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow([_NULL if row.get(c) is None else row[c] for c in columns])
+    buf.seek(0)
+    statement = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '{_NULL}')"
+    connection = db.connection()
+    dbapi = connection.dialect.dbapi
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(statement, buf)
+    except dbapi.Error as exc:
+        # The raw cursor bypasses SQLAlchemy's error wrapping
+        raise DBAPIError.instance(statement, None, exc, dbapi.Error) from exc
+    finally:
+        cursor.close()
+
+
+def _reject(db: Session, table: Table, message: str, *conditions) -> None:
+    db.execute(update(table).where(table.c.error.is_(None), *conditions).values(error=message))
+
+
+def _errors(db: Session, table: Table) -> RowErrors:
+    return [(row_no, [error]) for row_no, error in db.execute(select(table.c.row_no, table.c.error).where(table.c.error.is_not(None)))]
+
+
+def _load(db: Session, table: Table, rows: Sequence[dict], merge: Callable[[Session], int]) -> tuple[int, RowErrors]:
+    errors = []
+    valid = []
+    for row in rows:
+        problems = _check_row(table, row)
+        if problems:
+            errors.append((row["row_no"], problems))
+        else:
+            valid.append(row)
+    imported = 0
+    if valid:
+        try:
+            with db.begin_nested():
+                _copy(db, table, valid)
+                imported = merge(db)
+                errors += _errors(db, table)
+        except (DataError, IntegrityError) as exc:
+            reason = str(exc.orig).strip().splitlines()[0]
+            logger.warning("Import batch of {} rows into {} rejected by the database: {}", len(valid), table.name, reason)
+            errors += [(row["row_no"], [f"Not imported: the database rejected this batch ({reason})"]) for row in valid]
+    return imported, sorted(errors)
+
+
+def load_organizations(db: Session, rows: Sequence[dict]) -> tuple[int, RowErrors]:
+    """Rows carry ``row_no`` and ``password_hash`` plus the OrganizationCreate fields other than password."""
+    return _load(db, organization_staging, rows, _merge_organizations)
+
+
+def _merge_organizations(db: Session) -> int:
+    s = organization_staging
+    earlier = s.alias("earlier")
+    _reject(db, s, "Duplicate phone number in upload", exists().where(earlier.c.phone == s.c.phone, earlier.c.row_no < s.c.row_no))
+    _reject(db, s, "Organization with this phone number already exists", exists().where(Organization.phone == s.c.phone))
+    _reject(db, s, "Registrator not found", s.c.registrator_id.is_not(None), ~exists().where(User.id == s.c.registrator_id))
+    columns = ["name", "phone", "boss", "password_hash", "plan", "registrator_id", "registration_date", "plan_expiration_days", "is_active"]
+    result = db.execute(
+        insert(Organization).from_select(columns, select(*(s.c[c] for c in columns)).where(s.c.error.is_(None)).order_by(s.c.row_no))
+    )
+    return result.rowcount
+
+
+def load_payments(db: Session, rows: Sequence[dict]) -> tuple[int, RowErrors]:
+    """Rows carry ``row_no`` plus the PaymentCreate fields."""
+    return _load(db, payment_staging, rows, _merge_payments)
+
+
+def _merge_payments(db: Session) -> int:
+    s = payment_staging
+    _reject(db, s, "Organization not found", ~exists().where(Organization.id == s.c.organization_id))
+    _reject(db, s, f"source must be one of {', '.join(PAYMENT_SOURCES)}", s.c.source.not_in(PAYMENT_SOURCES))
+    valid = select(s.c.organization_id, s.c.amount, s.c.source, s.c.payment_date).where(s.c.error.is_(None))
+    # Same share lock as balances.record_payment, against concurrent registrator changes
+    db.execute(select(Organization.id).where(Organization.id.in_(valid.with_only_columns(s.c.organization_id))).with_for_update(read=True))
+    result = db.execute(
+        insert(Payment).from_select(["organization_id", "amount", "source", "payment_date"], valid.order_by(s.c.row_no))
+    )
+    db.execute(balances.record_payments(valid.subquery()))
+    db.execute(rollups.record_payments(valid.subquery()))
+    return result.rowcount
+
+
+def run(loader: Callable[[Session, Sequence[dict]], tuple[int, RowErrors]], rows: Sequence[dict]) -> tuple[int, RowErrors]:
+    """Load one batch in its own transaction."""
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        result = loader(db, rows)
+        db.commit()
+        return result
+    finally:
+        db.close()
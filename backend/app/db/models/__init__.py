@@ -7,6 +7,9 @@ from .add_on import AddOn
 from .payment import Payment
 from .user_payout import UserPayout
 from .registration_request import RegistrationRequest
+from .user_balance import UserBalance
+from .payment_daily_total import PaymentDailyTotal
+from .catalog_version import CatalogVersion
 
 # Re-export for Base.metadata creation on import
 all_models = [
@@ -19,4 +22,7 @@ all_models = [
     Payment,
     UserPayout,
     RegistrationRequest,
+    UserBalance,
+    PaymentDailyTotal,
+    CatalogVersion,
 ]
\ No newline at end of file
@@ -7,7 +7,7 @@ class AddOn(Base):
     __tablename__ = "add_ons"
 
     id = Column(String(255), primary_key=True)
-    organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"))
+    organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"), index=True)
     type = Column(String(20), nullable=False)
     quantity = Column(Integer, nullable=False, default=1)
     monthly_price = Column(Numeric(12, 2), nullable=False, default=0.00)
@@ -7,7 +7,7 @@ class Branch(Base):
     __tablename__ = "branches"
 
     id = Column(Integer, primary_key=True)
-    organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"))
+    organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"), index=True)
     name = Column(String(255), nullable=False)
     location = Column(Text, nullable=False)
     created_at = Column(DateTime, server_default=func.now())
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, BigInteger
+from app.db.base import Base
+
+class CatalogVersion(Base):
+    """Monotonic version per cached catalog, bumped in the same transaction as catalog writes."""
+
+    __tablename__ = "catalog_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0, server_default="0")
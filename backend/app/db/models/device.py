@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -15,4 +15,9 @@ class Device(Base):
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
-    branch = relationship("Branch", back_populates="devices")
\ No newline at end of file
+    branch = relationship("Branch", back_populates="devices")
+
+    __table_args__ = (
+        # Replaces the plain branch_id index; stale-device lists range-scan last_seen per branch
+        Index("ix_devices_branch_id_last_seen", "branch_id", "last_seen"),
+    )
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Date, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -8,11 +8,11 @@ class Organization(Base):
 
     id = Column(Integer, primary_key=True)
     name = Column(String(255), nullable=False)
-    phone = Column(String(20), nullable=False)
+    phone = Column(String(20), nullable=False, index=True)
     boss = Column(String(255), nullable=False)
     password_hash = Column(String, nullable=True)
-    plan = Column(String(50), nullable=False, default="Free")
-    registrator_id = Column(Integer, ForeignKey("users.id"))
+    plan = Column(String(50), nullable=False, default="Free", index=True)
+    registrator_id = Column(Integer, ForeignKey("users.id"), index=True)
     registration_date = Column(Date, nullable=False)
     plan_expiration_days = Column(Integer, default=30)
     is_active = Column(Boolean, default=True)
@@ -21,4 +21,10 @@ class Organization(Base):
 
     branches = relationship("Branch", back_populates="organization", cascade="all, delete-orphan")
     add_ons = relationship("AddOn", back_populates="organization", cascade="all, delete-orphan")
-    payments = relationship("Payment", back_populates="organization", cascade="all, delete-orphan")
\ No newline at end of file
+    payments = relationship("Payment", back_populates="organization", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # pg_trgm indexes backing the substring search in list_organizations
+        Index("ix_organizations_name_trgm", func.lower(name).label("name_lower"), postgresql_using="gin", postgresql_ops={"name_lower": "gin_trgm_ops"}),
+        Index("ix_organizations_phone_trgm", phone, postgresql_using="gin", postgresql_ops={"phone": "gin_trgm_ops"}),
+    )
\ No newline at end of file
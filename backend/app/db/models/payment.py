@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Date, DateTime, Numeric, String, ForeignKey, CheckConstraint
+from sqlalchemy import Column, Integer, Date, DateTime, Numeric, String, ForeignKey, CheckConstraint, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -9,7 +9,7 @@ class Payment(Base):
     id = Column(Integer, primary_key=True)
     organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"))
     amount = Column(Numeric(12, 2), nullable=False)
-    source = Column(String(50), nullable=False)
+    source = Column(String(50), nullable=False, index=True)
     payment_date = Column(Date, nullable=False)
     created_at = Column(DateTime, server_default=func.now())
 
@@ -17,4 +17,6 @@ class Payment(Base):
 
     __table_args__ = (
         CheckConstraint("source in ('Subscription','Click','Payme')", name="payments_source_check"),
+        Index("ix_payments_organization_id_payment_date", "organization_id", "payment_date"),
+        Index("ix_payments_payment_date_id", "payment_date", "id"),
     )
\ No newline at end of file
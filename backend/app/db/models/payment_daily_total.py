@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, Date, DateTime, Numeric, String, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+class PaymentDailyTotal(Base):
+    """Per organization/day/source payment rollup, maintained by app.db.rollups."""
+
+    __tablename__ = "payment_daily_totals"
+
+    organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    source = Column(String(50), primary_key=True)
+    amount = Column(Numeric(14, 2), nullable=False, default=0, server_default="0")
+    count = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_payment_daily_totals_day", "day"),
+    )
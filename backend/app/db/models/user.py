@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Numeric, CheckConstraint
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Numeric, CheckConstraint, Index
 from sqlalchemy.sql import func
 from app.db.base import Base
 
@@ -18,4 +18,7 @@ class User(Base):
 
     __table_args__ = (
         CheckConstraint("role IN ('admin','registrator','moderator')", name="users_role_check"),
+        # pg_trgm indexes backing the substring search in list_users
+        Index("ix_users_full_name_trgm", func.lower(full_name).label("full_name_lower"), postgresql_using="gin", postgresql_ops={"full_name_lower": "gin_trgm_ops"}),
+        Index("ix_users_phone_trgm", phone, postgresql_using="gin", postgresql_ops={"phone": "gin_trgm_ops"}),
     )
\ No newline at end of file
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, DateTime, Numeric, ForeignKey
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+class UserBalance(Base):
+    """Running earnings/payout totals per user, maintained by app.db.balances."""
+
+    __tablename__ = "user_balances"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total_earnings = Column(Numeric(14, 2), nullable=False, default=0, server_default="0")
+    total_payouts = Column(Numeric(14, 2), nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
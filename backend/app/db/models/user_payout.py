@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Date, DateTime, Numeric, String, ForeignKey, CheckConstraint
+from sqlalchemy import Column, Integer, Date, DateTime, Numeric, String, ForeignKey, CheckConstraint, Index
 from sqlalchemy.sql import func
 from app.db.base import Base
 
@@ -14,4 +14,5 @@ class UserPayout(Base):
 
     __table_args__ = (
         CheckConstraint("source in ('O''tkazma', 'Naqd pul')", name="user_payouts_source_check"),
+        Index("ix_user_payouts_user_id_payout_date", "user_id", "payout_date"),
     )
\ No newline at end of file
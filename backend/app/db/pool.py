@@ -0,0 +1,38 @@
+from time import perf_counter
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.core.metrics import Histogram
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    wait_histogram = Histogram()
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.wait_histogram.observe(perf_counter() - start)
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    wait_histogram = Histogram()
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.wait_histogram.observe(perf_counter() - start)
+
+
+def pool_status(pool: QueuePool) -> dict:
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        # QueuePool.overflow() starts at -pool_size and only goes positive once overflow connections are open
+        "overflow": max(pool.overflow(), 0),
+        "wait_seconds": pool.wait_histogram.snapshot(),
+    }
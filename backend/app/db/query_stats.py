@@ -0,0 +1,133 @@
+"""Per-request SQL statistics.
+
+``instrument`` hooks an engine's cursor events. While a request is being
+served, ``QueryStatsMiddleware`` keeps a ``QueryStats`` in a context variable;
+Starlette copies the context into the threadpool and AsyncSession runs its
+greenlets in the request task, so sync and async endpoints both report into it.
+Statements are fingerprinted by their SQL text, which is already parameterized,
+so the same statement run for every row of a page shows up as one fingerprint
+with a high count.
+"""
+import re
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Optional
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+
+
+class RepeatedQueryError(RuntimeError):
+    """Raised with QUERY_REPEAT_RAISE when a request repeats one statement too often."""
+
+
+class QueryStats:
+    __slots__ = ("count", "seconds", "statements")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: dict[str, int] = {}
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        return sorted(((s, n) for s, n in self.statements.items() if n > threshold), key=lambda item: -item[1])
+
+
+current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _type_name(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> str:
+    """Types of the bound parameters, never their values."""
+    if executemany and parameters:
+        return f"{len(parameters)} x {parameter_shape(parameters[0])}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {_type_name(value)}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(_type_name(value) for value in parameters) + ")"
+    return _type_name(parameters)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    context._query_started = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = perf_counter() - context._query_started
+    if settings.slow_query_ms and elapsed * 1000 >= settings.slow_query_ms:
+        logger.warning(
+            "Slow query {:.1f}ms: {} params={}",
+            elapsed * 1000,
+            _WHITESPACE.sub(" ", statement).strip(),
+            parameter_shape(parameters, executemany),
+        )
+    stats = current_stats.get()
+    if stats is None:
+        return
+    stats.count += 1
+    stats.seconds += elapsed
+    repeats = stats.statements[statement] = stats.statements.get(statement, 0) + 1
+    if settings.query_repeat_raise and repeats > settings.query_repeat_threshold:
+        raise RepeatedQueryError(f"Statement executed {repeats} times in one request: {_WHITESPACE.sub(' ', statement).strip()}")
+
+
+def instrument(engine: Engine) -> None:
+    # Any cursor listener moves SQLAlchemy onto its slower event-dispatch path
+    if not (settings.query_stats_enabled or settings.slow_query_ms):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """Collects QueryStats per request and reports them.
+
+    The query count and DB time go out as ``X-DB-Query-Count``/``X-DB-Time-Ms``
+    (as of the start of the response) and, via ``scope["query_stats"]``, as
+    fields of the access log line; requests repeating a statement more than
+    QUERY_REPEAT_THRESHOLD times log a warning naming the route and the statement.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = scope["query_stats"] = QueryStats()
+        token = current_stats.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("X-DB-Query-Count", str(stats.count))
+                headers.append("X-DB-Time-Ms", f"{stats.seconds * 1000:.1f}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_stats.reset(token)
+            self._report_repeats(scope, stats)
+
+    @staticmethod
+    def _report_repeats(scope: Scope, stats: QueryStats) -> None:
+        repeated = stats.repeated(settings.query_repeat_threshold)
+        if not repeated:
+            return
+        route = scope.get("route")
+        path = route.path if route else scope["path"]
+        log = logger.bind(db_queries=stats.count, db_time_ms=round(stats.seconds * 1000, 1))
+        for statement, count in repeated[:3]:
+            log.warning("{} {} ran one statement {} times (possible N+1): {}", scope["method"], path, count, _WHITESPACE.sub(" ", statement).strip()[:500])
@@ -0,0 +1,178 @@
+"""Daily payment rollup.
+
+``payment_daily_totals`` holds one row per organization, day and source.
+Payments are dated by day, so any date-range total can be answered from the
+rollup alone. ``create_payment`` upserts into it in the same transaction;
+``rebuild`` recomputes it from ``payments``. Revenue analytics are grouped
+over the rollup and cached in ``revenue_cache``::
+
+    python -m app.db.rollups rebuild
+"""
+import argparse
+import sys
+from datetime import date
+from decimal import Decimal
+from typing import Optional, Union
+from sqlalchemy import FromClause, Insert, Select, delete, func, literal_column, select, text, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.models.organization import Organization
+from app.db.models.payment import Payment
+from app.db.models.payment_daily_total import PaymentDailyTotal
+from app.db.models.user import User
+
+Amount = Union[Decimal, float]
+
+# Keyed by the analytics filters plus the current day. Cleared by this worker's
+# payment writes; the TTL bounds staleness from writes in other workers.
+revenue_cache = TTLCache(ttl_seconds=settings.analytics_cache_ttl_seconds)
+
+
+def _accumulate(stmt: Insert) -> Insert:
+    return stmt.on_conflict_do_update(
+        index_elements=[PaymentDailyTotal.organization_id, PaymentDailyTotal.day, PaymentDailyTotal.source],
+        set_={
+            "amount": PaymentDailyTotal.amount + stmt.excluded.amount,
+            "count": PaymentDailyTotal.count + stmt.excluded.count,
+            "updated_at": func.now(),
+        },
+    )
+
+
+def record_payment(organization_id: int, day: date, source: str, amount: Amount, count: int = 1) -> Insert:
+    return _accumulate(
+        pg_insert(PaymentDailyTotal).values(organization_id=organization_id, day=day, source=source, amount=amount, count=count)
+    )
+
+
+def record_payments(payments: FromClause) -> Insert:
+    """Set-based ``record_payment`` for a selectable with organization_id, payment_date, source and amount columns."""
+    return _accumulate(
+        pg_insert(PaymentDailyTotal).from_select(
+            ["organization_id", "day", "source", "amount", "count"],
+            select(payments.c.organization_id, payments.c.payment_date, payments.c.source, func.sum(payments.c.amount), func.count())
+            .group_by(payments.c.organization_id, payments.c.payment_date, payments.c.source),
+        )
+    )
+
+
+def revenue_total(start_date: date, end_date: date, organization_id: Optional[int] = None) -> Select:
+    stmt = select(func.coalesce(func.sum(PaymentDailyTotal.amount), 0)).where(
+        PaymentDailyTotal.day >= start_date,
+        PaymentDailyTotal.day <= end_date,
+    )
+    if organization_id is not None:
+        stmt = stmt.where(PaymentDailyTotal.organization_id == organization_id)
+    return stmt
+
+
+def revenue_breakdown_statement(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    organization_id: Optional[int] = None,
+    source: Optional[str] = None,
+    plan: Optional[str] = None,
+    registrator_id: Optional[int] = None,
+) -> Select:
+    """Revenue by month, source, plan and registrator in one GROUPING SETS query."""
+    # A literal keeps the select and GROUP BY expressions identical; a bound
+    # 'month' parameter would be rendered as two different placeholders.
+    month = func.date_trunc(literal_column("'month'"), PaymentDailyTotal.day)
+    stmt = (
+        select(
+            func.grouping(month, PaymentDailyTotal.source, Organization.plan, Organization.registrator_id).label("grouping"),
+            month.label("month"),
+            PaymentDailyTotal.source,
+            Organization.plan,
+            Organization.registrator_id,
+            func.max(User.full_name).label("registrator_name"),
+            func.sum(PaymentDailyTotal.amount).label("amount"),
+            func.sum(PaymentDailyTotal.count).label("count"),
+        )
+        .join(Organization, Organization.id == PaymentDailyTotal.organization_id)
+        .outerjoin(User, User.id == Organization.registrator_id)
+        .group_by(
+            func.grouping_sets(
+                tuple_(month),
+                tuple_(PaymentDailyTotal.source),
+                tuple_(Organization.plan),
+                tuple_(Organization.registrator_id),
+            )
+        )
+    )
+    if start_date:
+        stmt = stmt.where(PaymentDailyTotal.day >= start_date)
+    if end_date:
+        stmt = stmt.where(PaymentDailyTotal.day <= end_date)
+    if organization_id:
+        stmt = stmt.where(PaymentDailyTotal.organization_id == organization_id)
+    if source:
+        stmt = stmt.where(PaymentDailyTotal.source == source)
+    if plan:
+        stmt = stmt.where(Organization.plan == plan)
+    if registrator_id:
+        stmt = stmt.where(Organization.registrator_id == registrator_id)
+    return stmt
+
+
+# grouping() sets a bit for every argument that is aggregated away, most significant first
+_GROUPING_MONTH, _GROUPING_SOURCE, _GROUPING_PLAN, _GROUPING_REGISTRATOR = 0b0111, 0b1011, 0b1101, 0b1110
+
+
+def revenue_breakdown(rows) -> dict:
+    groups = {"by_month": [], "by_source": [], "by_plan": [], "by_registrator": []}
+    for r in rows:
+        item = {"amount": float(r.amount), "count": int(r.count)}
+        if r.grouping == _GROUPING_MONTH:
+            groups["by_month"].append({"key": r.month.strftime("%Y-%m"), **item})
+        elif r.grouping == _GROUPING_SOURCE:
+            groups["by_source"].append({"key": r.source, **item})
+        elif r.grouping == _GROUPING_PLAN:
+            groups["by_plan"].append({"key": r.plan, **item})
+        elif r.grouping == _GROUPING_REGISTRATOR:
+            key = str(r.registrator_id) if r.registrator_id is not None else None
+            groups["by_registrator"].append({"key": key, "label": r.registrator_name, **item})
+    groups["by_month"].sort(key=lambda g: g["key"])
+    for name in ("by_source", "by_plan", "by_registrator"):
+        groups[name].sort(key=lambda g: g["amount"], reverse=True)
+    # Every grouping set covers all rows, so any one of them sums to the total
+    groups["total_amount"] = sum(g["amount"] for g in groups["by_source"])
+    groups["total_count"] = sum(g["count"] for g in groups["by_source"])
+    return groups
+
+
+def rebuild(db: Session) -> int:
+    """Recompute the rollup from raw payments. Returns the number of rows written."""
+    db.execute(text("LOCK TABLE payments IN SHARE MODE"))
+    db.execute(delete(PaymentDailyTotal))
+    result = db.execute(
+        pg_insert(PaymentDailyTotal).from_select(
+            ["organization_id", "day", "source", "amount", "count"],
+            select(Payment.organization_id, Payment.payment_date, Payment.source, func.sum(Payment.amount), func.count())
+            .where(Payment.organization_id.is_not(None))
+            .group_by(Payment.organization_id, Payment.payment_date, Payment.source),
+        )
+    )
+    db.commit()
+    revenue_cache.clear()
+    return result.rowcount
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    from app.db.session import SessionLocal
+
+    parser = argparse.ArgumentParser(prog="python -m app.db.rollups", description="Maintain the payment_daily_totals rollup")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args(argv)
+    db = SessionLocal()
+    try:
+        print(f"rebuilt {rebuild(db)} daily totals")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,89 @@
-from sqlalchemy import create_engine
+from typing import TYPE_CHECKING
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.db.pool import InstrumentedQueuePool, InstrumentedAsyncAdaptedQueuePool
+from app.db.query_stats import instrument
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+def _pool_options() -> dict:
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def _connect_args() -> dict:
+    if not settings.db_statement_timeout_ms:
+        return {}
+    return {"options": f"-c statement_timeout={settings.db_statement_timeout_ms}"}
+
+
+def _async_connect_args() -> dict:
+    if not settings.db_statement_timeout_ms:
+        return {}
+    return {"server_settings": {"statement_timeout": str(settings.db_statement_timeout_ms)}}
+
+
+engine = create_engine(
+    settings.database_url,
+    poolclass=InstrumentedQueuePool,
+    connect_args=_connect_args(),
+    **_pool_options(),
+)
+instrument(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def get_async_database_url() -> str:
+    if settings.async_database_url:
+        return settings.async_database_url
+    url = make_url(settings.database_url).set(drivername="postgresql+asyncpg")
+    return url.render_as_string(hide_password=False)
+
+
+def create_async_engine_from_settings() -> "AsyncEngine":
+    # Imported here so the sync-only deployment does not need asyncpg installed
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async_engine = create_async_engine(
+        get_async_database_url(),
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        connect_args=_async_connect_args(),
+        **_pool_options(),
+    )
+    instrument(async_engine.sync_engine)
+    return async_engine
+
+
+# The asyncpg engine and its sessions only exist when async mode is enabled
+if settings.use_async_db:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = create_async_engine_from_settings()
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+else:
+    async_engine = None
+    AsyncSessionLocal = None
+
+
 def init_db() -> None:
     # Import models to ensure they are registered with Base.metadata
     from app.db.models import all_models  # noqa: F401
     from app.db.base import Base
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    with engine.begin() as conn:
+        # Needed by the gin_trgm_ops search indexes declared on the models
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    Base.metadata.create_all(bind=engine)
+
+
+async def dispose_async_engine() -> None:
+    if async_engine is not None:
+        await async_engine.dispose()
@@ -1,16 +1,22 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
 from app.core.config import settings
 from app.api.routers import api_router
 from app.api.routers.health import router as health_router
+from app.api.routers.metrics import router as metrics_router
 from app.api.error_handlers import register_error_handlers
-from app.core.logging import configure_logging
-from app.core.rate_limiter import RateLimiterMiddleware
-from app.db.session import init_db
+from app.core.logging import RequestContextMiddleware, configure_logging, parse_access_log_sample
+from app.core.metrics import MetricsMiddleware, request_metrics
+from app.core.rate_limiter import RateLimiterMiddleware, create_rate_limit_backend, parse_role_limits, parse_route_limits
+from app.db.session import SessionLocal, init_db, dispose_async_engine
+from app.db.query_stats import QueryStatsMiddleware
 from app.core.seed import seed_default_data
+from app.core.plan_catalog import plan_catalog
+from app.core.password_hasher import password_hasher
+from app.core.heartbeats import heartbeats
 
-app = FastAPI(title="Administrator Panel Backend System", version="1.0")
+app = FastAPI(title="Administrator Panel Backend System", version="1.0", default_response_class=ORJSONResponse)
 
 configure_logging()
 
@@ -20,9 +26,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Request-ID"],
 )
 
-app.add_middleware(BaseHTTPMiddleware, dispatch=RateLimiterMiddleware(max_requests_per_minute=100))
+rate_limit_backend = create_rate_limit_backend(settings)
+app.add_middleware(
+    RateLimiterMiddleware,
+    backend=rate_limit_backend,
+    max_requests_per_minute=settings.rate_limit_per_minute,
+    window_seconds=settings.rate_limit_window_seconds,
+    route_limits=parse_route_limits(settings.rate_limit_routes),
+    role_limits=parse_role_limits(settings.rate_limit_roles),
+)
+
+if settings.query_stats_enabled:
+    app.add_middleware(QueryStatsMiddleware)
+
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware, metrics=request_metrics)
+
+# Added last so it wraps everything else: rate-limited requests are logged and every record carries the request id
+app.add_middleware(
+    RequestContextMiddleware,
+    access_log=settings.access_log_enabled,
+    sample_rates=parse_access_log_sample(settings.access_log_sample),
+)
 
 register_error_handlers(app)
 
@@ -30,6 +58,33 @@ register_error_handlers(app)
 def on_startup() -> None:
     init_db()
     seed_default_data()
+    db = SessionLocal()
+    try:
+        plan_catalog.load(db)
+    finally:
+        db.close()
+
+@app.on_event("startup")
+async def start_background_tasks() -> None:
+    plan_catalog.start_watcher()
+    password_hasher.start()
+    heartbeats.start()
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    await plan_catalog.stop_watcher()
+    await heartbeats.stop()
+    await rate_limit_backend.close()
+    password_hasher.shutdown()
+    await dispose_async_engine()
 
 app.include_router(health_router, tags=["Health"])
-app.include_router(api_router, prefix="/api")
\ No newline at end of file
+if settings.metrics_enabled:
+    app.include_router(metrics_router, tags=["Metrics"])
+if settings.use_async_db:
+    # Only imported in async mode, so sync deployments never load the AsyncSession routers
+    from app.api.async_routers import api_router as async_api_router
+
+    app.include_router(async_api_router, prefix="/api")
+else:
+    app.include_router(api_router, prefix="/api")
\ No newline at end of file
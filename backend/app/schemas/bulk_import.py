@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import List
+
+class ImportRowError(BaseModel):
+    row: int
+    errors: List[str]
+
+class ImportReport(BaseModel):
+    received: int = 0
+    imported: int = 0
+    failed: int = 0
+    # Only the first MAX_REPORTED_ERRORS failures are listed; ``failed`` counts all of them
+    errors: List[ImportRowError] = []
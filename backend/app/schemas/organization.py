@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
-from datetime import date
+from datetime import date, datetime
 
 class OrganizationBase(BaseModel):
     name: str
@@ -87,6 +87,25 @@ class DeviceOut(BaseModel):
     class Config:
         from_attributes = True
 
+class DeviceHeartbeat(BaseModel):
+    device_ids: List[str] = Field(min_length=1, max_length=1000)
+
+class DeviceHeartbeatAccepted(BaseModel):
+    accepted: int
+
+class DevicePresenceItem(BaseModel):
+    id: str
+    last_heartbeat: datetime
+
+class DevicePresence(BaseModel):
+    organization_id: int
+    online_seconds: float
+    online_count: int
+    devices: List[DevicePresenceItem]
+
+class StaleDeviceOut(DeviceOut):
+    last_seen: Optional[datetime]
+
 class AddOnBase(BaseModel):
     type: str
     quantity: int
@@ -107,6 +126,8 @@ class AddOnOut(BaseModel):
 
 class OrganizationListResponse(BaseModel):
     items: List[OrganizationOut]
-    total: int
-    page: int
-    size: int
\ No newline at end of file
+    total: Optional[int] = None
+    # None on cursor pages
+    page: Optional[int] = None
+    size: int
+    next_cursor: Optional[str] = None
\ No newline at end of file
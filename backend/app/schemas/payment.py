@@ -23,9 +23,11 @@ class PaymentOut(BaseModel):
 
 class PaymentListResponse(BaseModel):
     items: List[PaymentOut]
-    total: int
-    page: int
+    total: Optional[int] = None
+    # None on cursor pages
+    page: Optional[int] = None
     size: int
+    next_cursor: Optional[str] = None
 
 class SverkaItem(BaseModel):
     date: date
@@ -35,4 +37,20 @@ class SverkaResponse(BaseModel):
     organization_id: int
     start_date: date
     end_date: date
-    total_amount: float
\ No newline at end of file
+    total_amount: float
+
+class RevenueGroup(BaseModel):
+    key: Optional[str]
+    label: Optional[str] = None
+    amount: float
+    count: int
+
+class RevenueAnalyticsResponse(BaseModel):
+    start_date: Optional[date]
+    end_date: Optional[date]
+    total_amount: float
+    total_count: int
+    by_month: List[RevenueGroup]
+    by_source: List[RevenueGroup]
+    by_plan: List[RevenueGroup]
+    by_registrator: List[RevenueGroup]
\ No newline at end of file
@@ -30,4 +30,6 @@ class UserBalanceItem(BaseModel):
     current_balance: float
 
 class UserBalancesResponse(BaseModel):
-    users: List[UserBalanceItem]
\ No newline at end of file
+    users: List[UserBalanceItem]
+    page: int = 1
+    size: int
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""The AsyncSession routers that main.py mounts with USE_ASYNC_DB=true.
+
+Each test writes through the async tree and reads the same paths from both
+trees, which have to answer alike.
+"""
+from typing import Iterator
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from fastapi.testclient import TestClient
+from app.api.error_handlers import register_error_handlers
+from app.core.config import settings
+from app.db import rollups, session
+from app.tests.utils import make_organization
+
+pytest.importorskip("asyncpg")
+
+
+@pytest.fixture(scope="module")
+def async_client(client) -> Iterator[TestClient]:
+    if settings.use_async_db:
+        # ``client`` already serves these routers, on the one async engine its event loop can use
+        pytest.skip("the app is running the async routers")
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from app.api.async_routers import api_router
+
+    app = FastAPI(default_response_class=ORJSONResponse)
+    register_error_handlers(app)
+    app.include_router(api_router, prefix="/api")
+    engine = session.create_async_engine_from_settings()
+    with pytest.MonkeyPatch.context() as monkeypatch, TestClient(app) as async_client:
+        monkeypatch.setattr(session, "async_engine", engine)
+        monkeypatch.setattr(session, "AsyncSessionLocal", async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False))
+        yield async_client
+        # asyncpg connections belong to the client's event loop
+        async_client.portal.call(engine.dispose)
+
+
+def assert_same(client, async_client, path: str, headers: dict, **params) -> dict:
+    sync_response = client.get(path, params=params, headers=headers)
+    async_response = async_client.get(path, params=params, headers=headers)
+    assert sync_response.status_code == async_response.status_code == 200
+    assert async_response.json() == sync_response.json()
+    return async_response.json()
+
+
+def test_organization_endpoints(client, async_client, db, admin_headers):
+    for _ in range(3):
+        make_organization(db, branches=2, devices_per_branch=1)
+    body = {"name": "Async Org", "phone": "+998930000001", "boss": "Boss", "password": "secret", "registration_date": "2026-01-01"}
+    created = async_client.post("/api/organizations", json=body, headers=admin_headers)
+    assert created.status_code == 201
+    org_id = created.json()["id"]
+    assert async_client.post(f"/api/organizations/{org_id}/branches", json={"name": "Main", "location": "Tashkent"}, headers=admin_headers).status_code == 201
+
+    first = assert_same(client, async_client, "/api/organizations", admin_headers, size=2)
+    assert first["items"][0]["id"] == org_id
+    assert_same(client, async_client, "/api/organizations", admin_headers, size=2, cursor=first["next_cursor"])
+    org = assert_same(client, async_client, f"/api/organizations/{org_id}", admin_headers)
+    assert [branch["name"] for branch in org["branches"]] == ["Main"]
+    assert_same(client, async_client, f"/api/organizations/phone/{body['phone']}", admin_headers)
+    assert_same(client, async_client, f"/api/organizations/{org_id}/branches", admin_headers)
+
+    updated = async_client.put(f"/api/organizations/{org_id}", json={"plan": "Premium", "password": "changed"}, headers=admin_headers)
+    assert updated.status_code == 200
+    assert updated.json()["plan"] == "Premium"
+    assert async_client.post("/api/organizations/login", json={"phone": body["phone"], "password": "changed"}).status_code == 200
+    assert async_client.post("/api/organizations/login", json={"phone": body["phone"], "password": "secret"}).status_code == 401
+
+    assert async_client.delete(f"/api/organizations/{org_id}", headers=admin_headers).status_code == 204
+    assert async_client.get(f"/api/organizations/{org_id}", headers=admin_headers).status_code == 404
+
+
+def test_payment_endpoints(client, async_client, db, admin_headers):
+    org = make_organization(db)
+    for day in (10, 11, 12):
+        body = {"organization_id": org.id, "amount": 100.5, "source": "Click", "payment_date": f"2026-02-{day}"}
+        assert async_client.post("/api/payments", json=body, headers=admin_headers).status_code == 201
+
+    first = assert_same(client, async_client, "/api/payments", admin_headers, organization_id=org.id, size=2)
+    assert [item["payment_date"] for item in first["items"]] == ["2026-02-12", "2026-02-11"]
+    second = assert_same(client, async_client, "/api/payments", admin_headers, organization_id=org.id, size=2, cursor=first["next_cursor"])
+    assert [item["payment_date"] for item in second["items"]] == ["2026-02-10"]
+    sverka = assert_same(client, async_client, f"/api/payments/sverka/{org.id}", admin_headers, start_date="2026-02-01", end_date="2026-02-28")
+    assert sverka["total_amount"] == 301.5
+
+    # Both trees compute the breakdown rather than one reading the other's cached result
+    rollups.revenue_cache.clear()
+    sync_analytics = client.get("/api/payments/analytics", params={"organization_id": org.id}, headers=admin_headers).json()
+    rollups.revenue_cache.clear()
+    assert async_client.get("/api/payments/analytics", params={"organization_id": org.id}, headers=admin_headers).json() == sync_analytics
+
+
+def test_user_endpoints(client, async_client, admin_headers):
+    body = {"full_name": "Async Registrator", "phone": "+998930000002", "password": "secret"}
+    created = async_client.post("/api/users", json=body, headers=admin_headers)
+    assert created.status_code == 201
+    user_id = created.json()["id"]
+    assert async_client.post("/api/users", json=body, headers=admin_headers).status_code == 400
+
+    page = assert_same(client, async_client, "/api/users", admin_headers, search="async registrator")
+    assert [item["id"] for item in page["items"]] == [user_id]
+    assert_same(client, async_client, f"/api/users/{user_id}", admin_headers)
+
+    updated = async_client.put(f"/api/users/{user_id}", json={"share_percentage": 12.5, "password": "changed"}, headers=admin_headers)
+    assert updated.status_code == 200
+    assert updated.json()["share_percentage"] == 12.5
+
+    assert async_client.delete(f"/api/users/{user_id}", headers=admin_headers).status_code == 204
+    assert async_client.get(f"/api/users/{user_id}", headers=admin_headers).status_code == 404
+
+
+def test_payout_endpoints(client, async_client, admin_headers):
+    user = async_client.post("/api/users", json={"full_name": "Paid Registrator", "phone": "+998930000003", "password": "secret"}, headers=admin_headers)
+    user_id = user.json()["id"]
+    for day in (10, 20):
+        body = {"user_id": user_id, "amount": 50, "source": "Naqd pul", "payout_date": f"2026-03-{day}"}
+        assert async_client.post("/api/user-payouts", json=body, headers=admin_headers).status_code == 201
+
+    page = assert_same(client, async_client, "/api/user-payouts", admin_headers, user_id=user_id, start_date="2026-03-15", end_date="2026-03-31")
+    assert [item["payout_date"] for item in page["items"]] == ["2026-03-20"]
+    for tree in (client, async_client):
+        assert tree.get("/api/user-payouts", params={"start_date": "March"}, headers=admin_headers).status_code == 422
@@ -0,0 +1,83 @@
+from datetime import datetime
+from time import time
+from sqlalchemy import select, update
+from app.core.heartbeats import HeartbeatBuffer, heartbeats
+from app.core.presence import PresenceIndex
+from app.db.models.device import Device
+from app.tests.utils import make_organization
+
+LONG_AGO = datetime(2020, 1, 1)
+
+
+def heartbeat(client, org_id: int, device_ids: list[str], headers: dict):
+    return client.post(f"/api/organizations/{org_id}/devices/heartbeat", json={"device_ids": device_ids}, headers=headers)
+
+
+def online(client, org_id: int, headers: dict) -> set[str]:
+    response = client.get(f"/api/organizations/{org_id}/devices/presence", headers=headers)
+    assert response.status_code == 200
+    return {device["id"] for device in response.json()["devices"]}
+
+
+def last_seen(db, device_id: str) -> datetime:
+    db.expire_all()
+    return db.scalar(select(Device.last_seen).where(Device.id == device_id))
+
+
+def test_heartbeat_for_another_organizations_device_keeps_the_owners(client, db, admin_headers):
+    owner = make_organization(db, branches=1, devices_per_branch=1)
+    other = make_organization(db)
+    [device_id] = [d.id for d in owner.branches[0].devices]
+    db.execute(update(Device).where(Device.id == device_id).values(last_seen=LONG_AGO))
+    db.commit()
+
+    assert heartbeat(client, owner.id, [device_id], admin_headers).status_code == 202
+    assert heartbeat(client, other.id, [device_id], admin_headers).status_code == 202
+    heartbeats.flush()
+    assert last_seen(db, device_id) > LONG_AGO
+
+
+def test_heartbeat_buffer_caps_each_organization_separately():
+    buffer = HeartbeatBuffer(max_devices=2)
+    assert buffer.record(1, ["a", "b"])
+    assert not buffer.record(1, ["c"])
+    # Repeats of buffered devices still fit
+    assert buffer.record(1, ["a", "b"])
+    # Other organizations, even with the same ids, have their own share
+    assert buffer.record(2, ["a", "c"])
+    assert len(buffer) == 4
+    assert buffer.rejected == 1
+
+
+def test_heartbeat_buffer_counts_repeated_ids_once():
+    buffer = HeartbeatBuffer(max_devices=2)
+    assert buffer.record(1, ["a", "a", "a", "b"])
+    assert not buffer.record(1, ["c", "c", "c"])
+    assert len(buffer) == 2
+    assert buffer.rejected == 1
+
+
+def test_only_devices_of_the_organization_show_up_online(client, db, admin_headers):
+    owner = make_organization(db, branches=1, devices_per_branch=2)
+    other = make_organization(db)
+    mine, theirs = [d.id for d in owner.branches[0].devices]
+
+    heartbeat(client, owner.id, [mine, "no-such-device"], admin_headers)
+    heartbeat(client, other.id, [theirs, "no-such-device"], admin_headers)
+    # Presence is filled in by the flush, once the ids are matched to the organization
+    assert online(client, owner.id, admin_headers) == set()
+    heartbeats.flush()
+    assert online(client, owner.id, admin_headers) == {mine}
+    assert online(client, other.id, admin_headers) == set()
+
+
+def test_presence_caps_each_organization_separately():
+    index = PresenceIndex(online_seconds=60, max_devices=2)
+    now = time()
+    index.record(1, [("a", now - 90), ("b", now), ("c", now)])
+    index.record(2, [("a", now), ("c", now)])
+    assert set(index.online(2)) == {"a", "c"}
+    # "a" expired and made room for "c"
+    assert set(index.online(1)) == {"b", "c"}
+    index.record(1, [("d", now)])
+    assert set(index.online(1)) == {"b", "c"}
@@ -0,0 +1,93 @@
+from sqlalchemy import func, select
+from app.core.config import settings
+from app.db import bulk_import
+from app.db.models.organization import Organization
+from app.db.models.payment import Payment
+from app.tests.utils import make_organization
+
+CSV = {"Content-Type": "text/csv"}
+
+
+def post_csv(client, path: str, lines: list[str], headers: dict) -> dict:
+    response = client.post(path, content="\n".join(lines) + "\n", headers={**headers, **CSV})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def errors_by_row(report: dict) -> dict[int, list[str]]:
+    return {e["row"]: e["errors"] for e in report["errors"]}
+
+
+def test_organization_import_reports_bad_rows_and_imports_the_rest(client, db, admin_headers):
+    report = post_csv(
+        client,
+        "/api/import/organizations",
+        [
+            "name,phone,boss,password,registration_date",
+            "Alpha,+998911000001,Boss,secret,2026-01-01",
+            "Beta,+998911000002-ext-1234567,Boss,secret,2026-01-01",
+            "Gamma,+998911000003,Boss,secret,2026-01-01",
+            "Delta,+998911000001,Boss,secret,2026-01-01",
+            "Epsilon,+998911000005,Boss,secret,not-a-date",
+        ],
+        admin_headers,
+    )
+    assert (report["received"], report["imported"], report["failed"]) == (5, 2, 3)
+    errors = errors_by_row(report)
+    assert errors[2] == ["phone: String should have at most 20 characters"]
+    assert errors[4] == ["Duplicate phone number in upload"]
+    assert errors[5][0].startswith("registration_date:")
+    names = db.scalars(select(Organization.name).where(Organization.phone.like("+99891100000%"))).all()
+    assert sorted(names) == ["Alpha", "Gamma"]
+
+
+def test_payment_import_rejects_values_that_do_not_fit(client, db, admin_headers):
+    org = make_organization(db)
+    report = post_csv(
+        client,
+        "/api/import/payments",
+        [
+            "organization_id,amount,source,payment_date",
+            f"{org.id},150000.50,Click,2026-02-01",
+            f"{org.id},1000000000000000,Click,2026-02-01",
+            f"{org.id},9999999999.995,Payme,2026-02-01",
+            f"{org.id},nan,Payme,2026-02-01",
+            f"{org.id},10.00,Cash,2026-02-01",
+            f"99999999999,10.00,Click,2026-02-01",
+            f"{org.id},9999999999.99,Payme,2026-02-02",
+        ],
+        admin_headers,
+    )
+    assert (report["received"], report["imported"], report["failed"]) == (7, 2, 5)
+    errors = errors_by_row(report)
+    assert errors[2] == errors[3] == ["amount: Input should be less than 10^10 in absolute value"]
+    assert errors[4] == ["amount: Input should be a finite number"]
+    assert errors[5] == ["source must be one of Subscription, Click, Payme"]
+    assert errors[6] == ["organization_id: Input should be between -2147483648 and 2147483647"]
+    amounts = db.scalars(select(Payment.amount).where(Payment.organization_id == org.id).order_by(Payment.amount)).all()
+    assert [str(a) for a in amounts] == ["150000.50", "9999999999.99"]
+
+
+def test_batch_rejected_by_the_database_is_reported_not_raised(client, db, admin_headers, monkeypatch):
+    # Let an oversized phone through to the COPY to exercise the savepoint
+    monkeypatch.setattr(bulk_import, "_check_row", lambda table, row: [])
+    monkeypatch.setattr(settings, "import_batch_size", 2)
+    report = post_csv(
+        client,
+        "/api/import/organizations",
+        [
+            "name,phone,boss,password,registration_date",
+            "One,+998912000001,Boss,secret,2026-01-01",
+            "Two,+998912000002,Boss,secret,2026-01-01",
+            "Three,+998912000003-ext-1234567,Boss,secret,2026-01-01",
+            "Four,+998912000004,Boss,secret,2026-01-01",
+            "Five,+998912000005,Boss,secret,2026-01-01",
+        ],
+        admin_headers,
+    )
+    assert (report["received"], report["imported"], report["failed"]) == (5, 3, 2)
+    errors = errors_by_row(report)
+    assert set(errors) == {3, 4}
+    assert errors[3][0].startswith("Not imported: the database rejected this batch (value too long")
+    imported = db.scalar(select(func.count()).select_from(Organization).where(Organization.phone.like("+99891200000%")))
+    assert imported == 3
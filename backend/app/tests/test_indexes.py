@@ -0,0 +1,139 @@
+"""The router queries must be served by the indexes added for them.
+
+Seeded tables are far too small for the planner to prefer an index on cost,
+so sequential scans are priced out with ``enable_seqscan = off``: a query
+with no usable index then still shows up as a Seq Scan, or as a full scan of
+some other index, and fails the check.
+"""
+from datetime import date, timedelta
+from uuid import uuid4
+import pytest
+from sqlalchemy import select, tuple_
+from app.api.filters import filter_organizations, filter_payments, filter_stale_devices
+from app.db.models.add_on import AddOn
+from app.db.models.branch import Branch
+from app.db.models.device import Device
+from app.db.models.organization import Organization
+from app.db.models.payment import Payment
+from app.db.models.user import User
+from app.db.models.user_payout import UserPayout
+from app.db.session import SessionLocal, engine
+from app.tests.utils import make_organization
+
+
+@pytest.fixture(scope="module")
+def seeded(client) -> dict:
+    db = SessionLocal()
+    try:
+        admin = db.execute(select(User).where(User.phone == "admin")).scalar_one()
+        orgs = [make_organization(db, branches=2, devices_per_branch=3, registrator_id=admin.id) for _ in range(10)]
+        for i in range(300):
+            org = orgs[i % len(orgs)]
+            db.add(Payment(organization_id=org.id, amount=100, source=("Click", "Payme", "Subscription")[i % 3], payment_date=date(2026, 1, 1) + timedelta(days=i % 90)))
+        for i in range(100):
+            db.add(UserPayout(user_id=admin.id, amount=10, source="Naqd pul", payout_date=date(2026, 1, 1) + timedelta(days=i)))
+        for org in orgs:
+            db.add(AddOn(id=str(uuid4()), organization_id=org.id, type="device", quantity=1))
+        db.commit()
+        ids = {"organization_id": orgs[0].id, "phone": orgs[0].phone, "user_id": admin.id}
+    finally:
+        db.close()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    return ids
+
+
+def _index_names(plan: dict) -> list:
+    names = [plan["Index Name"]] if "Index Name" in plan else []
+    for child in plan.get("Plans", ()):
+        names += _index_names(child)
+    return names
+
+
+def _scans(plan: dict, found: list) -> list:
+    if plan["Node Type"] == "Bitmap Heap Scan":
+        # The indexes are named on the Bitmap Index Scan children
+        found += [(plan["Relation Name"], plan["Node Type"], name) for name in _index_names(plan)]
+    elif "Relation Name" in plan:
+        found.append((plan["Relation Name"], plan["Node Type"], plan.get("Index Name")))
+    for child in plan.get("Plans", ()):
+        _scans(child, found)
+    return found
+
+
+def explain_scans(stmt) -> list[tuple[str, str, str]]:
+    """(table, node type, index) for every scan in the plan of ``stmt``."""
+    with engine.connect() as conn:
+        conn.exec_driver_sql("SET enable_seqscan = off")
+        compiled = stmt.compile(dialect=conn.dialect)
+        [plan] = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params).scalar()
+        conn.rollback()
+    return _scans(plan["Plan"], [])
+
+
+CASES = {
+    "organization_by_phone": (
+        lambda ids: select(Organization).where(Organization.phone == ids["phone"]),
+        "organizations",
+        "ix_organizations_phone",
+    ),
+    "organizations_by_plan": (
+        lambda ids: filter_organizations(select(Organization), plan="Premium").order_by(Organization.id.desc()).limit(11),
+        "organizations",
+        "ix_organizations_plan",
+    ),
+    "organizations_by_registrator": (
+        lambda ids: select(Organization.id).where(Organization.registrator_id == ids["user_id"] + 1000),
+        "organizations",
+        "ix_organizations_registrator_id",
+    ),
+    "payments_by_organization_and_date": (
+        lambda ids: filter_payments(select(Payment), ids["organization_id"], date(2026, 1, 10), date(2026, 1, 20)),
+        "payments",
+        "ix_payments_organization_id_payment_date",
+    ),
+    "payments_keyset_page": (
+        lambda ids: select(Payment)
+        .where(tuple_(Payment.payment_date, Payment.id) < (date(2026, 2, 1), 10**9))
+        .order_by(Payment.payment_date.desc(), Payment.id.desc())
+        .limit(11),
+        "payments",
+        "ix_payments_payment_date_id",
+    ),
+    "payments_by_source": (
+        lambda ids: select(Payment.id).where(Payment.source == "Unknown"),
+        "payments",
+        "ix_payments_source",
+    ),
+    "payouts_by_user": (
+        lambda ids: select(UserPayout)
+        .where(UserPayout.user_id == ids["user_id"])
+        .order_by(UserPayout.payout_date.desc(), UserPayout.id.desc())
+        .limit(11),
+        "user_payouts",
+        "ix_user_payouts_user_id_payout_date",
+    ),
+    "branches_of_organization": (
+        lambda ids: select(Branch).where(Branch.organization_id == ids["organization_id"]),
+        "branches",
+        "ix_branches_organization_id",
+    ),
+    "stale_devices": (
+        lambda ids: filter_stale_devices(select(Device), ids["organization_id"], timedelta(hours=24)),
+        "devices",
+        "ix_devices_branch_id_last_seen",
+    ),
+    "add_ons_of_organization": (
+        lambda ids: select(AddOn).where(AddOn.organization_id == ids["organization_id"]),
+        "add_ons",
+        "ix_add_ons_organization_id",
+    ),
+}
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_query_uses_index(seeded, name):
+    build, table, index = CASES[name]
+    scans = [(node, index_name) for relation, node, index_name in explain_scans(build(seeded)) if relation == table]
+    assert scans, f"{table} is not scanned"
+    assert all(index_name == index for _, index_name in scans), scans
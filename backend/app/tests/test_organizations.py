@@ -0,0 +1,43 @@
+from app.tests.utils import make_organization, query_count
+
+
+def test_list_query_count_does_not_grow_with_page_size(client, db, admin_headers):
+    for _ in range(50):
+        make_organization(db, branches=2)
+
+    counts = {}
+    for size in (1, 50):
+        response = client.get("/api/organizations", params={"size": size}, headers=admin_headers)
+        assert response.status_code == 200
+        assert len(response.json()["items"]) == size
+        assert all(len(item["branches"]) == 2 for item in response.json()["items"])
+        counts[size] = query_count(response)
+    assert counts[1] == counts[50]
+
+
+def test_reads_load_branches_in_one_query(client, db, admin_headers):
+    org = make_organization(db, branches=5)
+
+    by_id = client.get(f"/api/organizations/{org.id}", headers=admin_headers)
+    by_phone = client.get(f"/api/organizations/phone/{org.phone}", headers=admin_headers)
+    for response in (by_id, by_phone):
+        assert response.status_code == 200
+        assert len(response.json()["branches"]) == 5
+        # The organization, then all of its branches
+        assert query_count(response) == 2
+
+
+def test_cursor_pages_skip_the_count(client, db, admin_headers):
+    for _ in range(3):
+        make_organization(db, branches=1)
+
+    first = client.get("/api/organizations", params={"size": 2}, headers=admin_headers)
+    assert first.json()["total"] is not None
+    assert first.json()["page"] == 1
+    second = client.get("/api/organizations", params={"size": 2, "cursor": first.json()["next_cursor"]}, headers=admin_headers)
+    assert second.status_code == 200
+    assert len(second.json()["items"]) == 2
+    assert second.json()["total"] is None
+    assert second.json()["page"] is None
+    # The organizations and their branches, without the count(*)
+    assert query_count(second) == query_count(first) - 1 == 2
@@ -0,0 +1,78 @@
+import pytest
+from fastapi.testclient import TestClient
+from loguru import logger
+from sqlalchemy import select
+from app.core.config import settings
+from app.db.models.organization import Organization
+from app.db.query_stats import RepeatedQueryError
+from app.db.session import SessionLocal
+from app.tests.utils import make_organization, query_count
+
+ORGANIZATIONS = 5
+N_PLUS_ONE_PATH = "/test/organizations/branches"
+
+
+@pytest.fixture
+def n_plus_one(client, db, monkeypatch) -> TestClient:
+    """Mounts a route on the real app that lazy-loads every organization's branches, one query each."""
+    from app.main import app
+
+    ids = [make_organization(db, branches=1).id for _ in range(ORGANIZATIONS)]
+    monkeypatch.setattr(settings, "query_repeat_threshold", 3)
+
+    def branches() -> int:
+        with SessionLocal() as session:
+            orgs = session.scalars(select(Organization).where(Organization.id.in_(ids))).all()
+            return sum(len(org.branches) for org in orgs)
+
+    app.add_api_route(N_PLUS_ONE_PATH, branches, methods=["GET"])
+    yield client
+    app.router.routes[:] = [route for route in app.router.routes if getattr(route, "path", None) != N_PLUS_ONE_PATH]
+
+
+@pytest.fixture
+def records() -> list:
+    records = []
+    sink = logger.add(lambda message: records.append(message.record), level="WARNING")
+    yield records
+    logger.remove(sink)
+
+
+def warnings(records: list) -> list:
+    return [record for record in records if record["level"].name == "WARNING"]
+
+
+def test_repeated_statement_is_reported(n_plus_one, records):
+    response = n_plus_one.get(N_PLUS_ONE_PATH)
+    assert response.status_code == 200
+    assert response.json() == ORGANIZATIONS
+    # The organizations, then their branches one at a time
+    assert query_count(response) == ORGANIZATIONS + 1
+    assert float(response.headers["X-DB-Time-Ms"]) > 0
+
+    [record] = warnings(records)
+    assert f"GET {N_PLUS_ONE_PATH} ran one statement {ORGANIZATIONS} times (possible N+1)" in record["message"]
+    assert "FROM branches" in record["message"]
+    assert record["extra"]["db_queries"] == ORGANIZATIONS + 1
+    assert record["extra"]["db_time_ms"] > 0
+    assert record["extra"]["request_id"] == response.headers["X-Request-ID"]
+
+
+def test_repeated_statement_raises_through_the_app(n_plus_one, records, monkeypatch):
+    monkeypatch.setattr(settings, "query_repeat_raise", True)
+    with pytest.raises(RepeatedQueryError, match="Statement executed 4 times in one request"):
+        n_plus_one.get(N_PLUS_ONE_PATH, headers={"X-Request-ID": "n-plus-one"})
+    # The request is still reported, with the queries run up to the error
+    [record] = warnings(records)
+    assert "ran one statement 4 times" in record["message"]
+    assert record["extra"]["db_queries"] == 5
+    [error] = [record for record in records if record["level"].name == "ERROR"]
+    assert error["message"] == f"Unhandled error in GET {N_PLUS_ONE_PATH}"
+    assert error["extra"]["request_id"] == "n-plus-one"
+
+
+def test_unhandled_error_is_answered_with_the_standard_body(n_plus_one, monkeypatch):
+    monkeypatch.setattr(settings, "query_repeat_raise", True)
+    response = TestClient(n_plus_one.app, raise_server_exceptions=False).get(N_PLUS_ONE_PATH)
+    assert response.status_code == 500
+    assert response.json() == {"error": {"code": 500, "message": "Internal server error"}}
@@ -0,0 +1,157 @@
+"""Both rate-limit backends must agree on the same sliding-window cases.
+
+The Redis backend runs its Lua script against fakeredis. Its fallback fails
+the test, so a Redis error can't quietly hand the check to the memory
+backend. The clock is patched, so windows are exact.
+"""
+from typing import Optional, Sequence
+import pytest
+from app.core import rate_limiter
+from app.core.config import Settings
+from app.core.rate_limiter import (
+    MemoryRateLimitBackend,
+    RateLimit,
+    RateLimiterMiddleware,
+    RedisRateLimitBackend,
+    parse_role_limits,
+    parse_route_limits,
+)
+from app.core.security import create_access_token
+
+
+class FailingFallback:
+    async def hit(self, limits: Sequence[RateLimit]) -> bool:
+        raise AssertionError("Redis backend fell back to per-process limits")
+
+
+class Clock:
+    def __init__(self, now: float) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    # Start of a fixed window, far from any real-time window boundary
+    clock = Clock(600_000.0)
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "redis"])
+async def backend(request):
+    if request.param == "memory":
+        yield MemoryRateLimitBackend()
+        return
+    fakeredis = pytest.importorskip("fakeredis", reason="the Redis backend is tested against fakeredis")
+    pytest.importorskip("lupa", reason="fakeredis needs lupa to run Lua scripts")
+    backend = RedisRateLimitBackend(fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer()), fallback=FailingFallback())
+    yield backend
+    await backend.close()
+
+
+async def admitted(backend, limits: Sequence[RateLimit], attempts: int) -> int:
+    return sum([await backend.hit(limits) for _ in range(attempts)])
+
+
+async def test_admits_limit_per_window(backend, clock):
+    limit = RateLimit("ip:10.0.0.1", 10, 60)
+    assert await admitted(backend, [limit], 15) == 10
+
+
+async def test_previous_window_is_weighted_by_overlap(backend, clock):
+    limit = RateLimit("ip:10.0.0.1", 10, 60)
+    assert await admitted(backend, [limit], 10) == 10
+    # Halfway through the next window half of the previous count still applies
+    clock.now += 90
+    assert await admitted(backend, [limit], 10) == 5
+    # A window later only the 5 admitted above still weigh in, at half
+    clock.now += 60
+    assert await admitted(backend, [limit], 10) == 8
+    clock.now += 120
+    assert await admitted(backend, [limit], 15) == 10
+
+
+async def test_keys_are_counted_separately(backend, clock):
+    assert await admitted(backend, [RateLimit("ip:10.0.0.1", 3, 60)], 5) == 3
+    assert await admitted(backend, [RateLimit("ip:10.0.0.2", 3, 60)], 5) == 3
+
+
+async def test_request_is_rejected_when_any_limit_is_exhausted(backend, clock):
+    client = RateLimit("user:1", 10, 60)
+    route = RateLimit("user:1|POST /api/auth/login", 2, 60)
+    assert await admitted(backend, [client, route], 5) == 2
+    # Rejected requests still counted against the client limit
+    assert await admitted(backend, [client], 10) == 5
+
+
+def make_middleware(backend, settings: Settings) -> RateLimiterMiddleware:
+    async def ok(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    return RateLimiterMiddleware(
+        ok,
+        backend=backend,
+        max_requests_per_minute=settings.rate_limit_per_minute,
+        window_seconds=settings.rate_limit_window_seconds,
+        route_limits=parse_route_limits(settings.rate_limit_routes),
+        role_limits=parse_role_limits(settings.rate_limit_roles),
+    )
+
+
+async def statuses(middleware, method: str, path: str, attempts: int, token: Optional[str] = None, ip: str = "10.0.0.1") -> list[int]:
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    scope = {"type": "http", "method": method, "path": path, "headers": headers, "client": (ip, 1234)}
+    result = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result.append(message["status"])
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    for _ in range(attempts):
+        await middleware(dict(scope), receive, send)
+    return result
+
+
+@pytest.fixture
+def limited_settings() -> Settings:
+    return Settings(
+        rate_limit_per_minute=5,
+        rate_limit_window_seconds=60,
+        rate_limit_routes="POST /api/auth/login=2,/api/payments/analytics=3",
+        rate_limit_roles="admin=8,registrator=4",
+    )
+
+
+async def test_middleware_default_limit_by_ip(backend, clock, limited_settings):
+    middleware = make_middleware(backend, limited_settings)
+    assert (await statuses(middleware, "GET", "/api/plans", 7)).count(200) == 5
+    assert (await statuses(middleware, "GET", "/api/plans", 7, ip="10.0.0.2")).count(200) == 5
+
+
+async def test_middleware_role_limits(backend, clock, limited_settings):
+    middleware = make_middleware(backend, limited_settings)
+    admin = create_access_token("1", {"role": "admin"})
+    registrator = create_access_token("2", {"role": "registrator"})
+    organization = create_access_token("3", {"role": "organization"})
+    assert (await statuses(middleware, "GET", "/api/plans", 10, admin)).count(200) == 8
+    assert (await statuses(middleware, "GET", "/api/plans", 10, registrator)).count(200) == 4
+    # Roles without their own limit get the default
+    assert (await statuses(middleware, "GET", "/api/plans", 10, organization)).count(200) == 5
+
+
+async def test_middleware_route_limits(backend, clock, limited_settings):
+    middleware = make_middleware(backend, limited_settings)
+    admin = create_access_token("1", {"role": "admin"})
+    login = await statuses(middleware, "POST", "/api/auth/login", 4)
+    assert login == [200, 200, 429, 429]
+    # The method-specific rule does not apply to other methods
+    assert (await statuses(middleware, "GET", "/api/auth/login", 3, ip="10.0.0.2")).count(200) == 3
+    # Route limits hold for users with a higher role limit too
+    assert (await statuses(middleware, "GET", "/api/payments/analytics", 5, admin)).count(200) == 3
@@ -0,0 +1,33 @@
+from datetime import date
+from itertools import count
+from sqlalchemy.orm import Session
+from app.core.security import create_access_token
+from app.db.models.branch import Branch
+from app.db.models.device import Device
+from app.db.models.organization import Organization
+
+_unique = count(1)
+
+
+def auth_headers(role: str, subject: str = "1") -> dict:
+    return {"Authorization": f"Bearer {create_access_token(subject, {'role': role})}"}
+
+
+def make_organization(db: Session, branches: int = 0, devices_per_branch: int = 0, **fields) -> Organization:
+    """Insert an organization with branches and devices directly, skipping the API and bcrypt."""
+    n = next(_unique)
+    values = {"name": f"Org {n}", "phone": f"+99890{n:07d}", "boss": "Boss", "plan": "Free", "registration_date": date(2026, 1, 1)}
+    org = Organization(**{**values, **fields})
+    for b in range(branches):
+        branch = Branch(name=f"Branch {b}", location="Tashkent")
+        branch.devices = [Device(id=f"dev-{n}-{b}-{d}", name=f"Device {d}", os="android") for d in range(devices_per_branch)]
+        org.branches.append(branch)
+    db.add(org)
+    db.commit()
+    db.refresh(org)
+    return org
+
+
+def query_count(response) -> int:
+    """Statements the request ran, as reported by QueryStatsMiddleware."""
+    return int(response.headers["X-DB-Query-Count"])
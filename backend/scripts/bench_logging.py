@@ -0,0 +1,109 @@
+"""Logging cost per request, driven in-process over ASGI.
+
+Usage (from backend/): PYTHONPATH=. python scripts/bench_logging.py [requests]
+
+Each pipeline writes one access line per request around a no-op app:
+
+- before: the previous setup. uvicorn's access line goes through the stdlib
+  ``uvicorn.access`` logger and the old InterceptHandler, which walked the
+  stack with ``opt(depth=6)``. loguru then writes synchronously to the stream.
+- after: RequestContextMiddleware writes the access line as JSON into
+  BackgroundWriter. The writer thread does the stream writes.
+
+Both run against /dev/null and against a pipe that a reader thread drains
+slowly, as a busy log collector would. The log lines never reach the
+terminal; results go to stdout.
+"""
+import asyncio
+import logging
+import os
+import sys
+from threading import Thread
+from time import sleep
+from loguru import logger
+from benchutil import asgi_request, measure
+from app.core.logging import BackgroundWriter, RequestContextMiddleware, _json_format
+
+
+async def noop(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+class OldInterceptHandler(logging.Handler):
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+        logger.opt(depth=6, exception=record.exc_info).log(level, record.getMessage())
+
+
+class UvicornAccessLog:
+    """The access line uvicorn's protocol wrote once the response was sent."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self.log = logging.getLogger("uvicorn.access")
+
+    async def __call__(self, scope, receive, send):
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+        self.log.info('%s - "%s %s HTTP/%s" %d', f"{scope['client'][0]}:{scope['client'][1]}", scope["method"], scope["path"], scope["http_version"], status)
+
+
+def before(stream):
+    access = logging.getLogger("uvicorn.access")
+    access.handlers = [OldInterceptHandler()]
+    access.setLevel(logging.INFO)
+    access.propagate = False
+    logger.remove()
+    logger.add(stream, level="INFO", serialize=False, backtrace=True, diagnose=False)
+    return UvicornAccessLog(noop), None
+
+
+def after(stream):
+    writer = BackgroundWriter(stream)
+    writer.start()
+    logger.remove()
+    logger.add(writer, level="INFO", format=_json_format, backtrace=False, diagnose=False)
+    return RequestContextMiddleware(noop, access_log=True), writer
+
+
+def slow_pipe():
+    read_fd, write_fd = os.pipe()
+
+    def drain():
+        with os.fdopen(read_fd, "rb") as reader:
+            # About 400KB/s, below what the access lines need at full speed
+            while reader.read1(4096):
+                sleep(0.01)
+
+    Thread(target=drain, daemon=True).start()
+    return os.fdopen(write_fd, "w")
+
+
+async def main() -> None:
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    for target, open_stream in (("/dev/null", lambda: open(os.devnull, "w")), ("slow pipe", slow_pipe)):
+        for name, build in (("before", before), ("after", after)):
+            stream = open_stream()
+            app, writer = build(stream)
+            result = await measure(lambda: asgi_request(app, "GET", "/api/plans"), requests)
+            logger.remove()
+            dropped = writer.dropped if writer else 0
+            if writer:
+                writer.stop()
+            stream.close()
+            print(f"{target:10s} {name:7s} {result['mean_us']:6.1f}us/request  p99 {result['p99_us']:6.1f}us  dropped {dropped}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,50 @@
+"""Per-request cost of MetricsMiddleware, driven in-process over ASGI.
+
+Usage (from backend/): PYTHONPATH=. python scripts/bench_metrics.py [requests]
+
+The same no-op app is measured bare and wrapped in the middleware; the
+difference is what the instrumentation adds to every request. The app sets
+``scope["route"]`` the way the router does and answers with a handful of
+statuses over 40 route templates, so the series dict is realistically sized.
+"""
+import asyncio
+import sys
+from itertools import count
+from benchutil import asgi_request, measure
+from app.core.metrics import MetricsMiddleware, RequestMetrics
+
+ROUTES = [f"/api/resource{i}/{{item_id}}" for i in range(40)]
+STATUSES = (200, 200, 200, 201, 404)
+
+
+class Route:
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+
+def make_app():
+    routes = [Route(path) for path in ROUTES]
+    calls = count()
+
+    async def app(scope, receive, send):
+        n = next(calls)
+        scope["route"] = routes[n % len(routes)]
+        await send({"type": "http.response.start", "status": STATUSES[n % len(STATUSES)], "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    return app
+
+
+async def main() -> None:
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    metrics = RequestMetrics()
+    apps = {"bare": make_app(), "metrics": MetricsMiddleware(make_app(), metrics)}
+    results = {}
+    for name, app in apps.items():
+        results[name] = await measure(lambda: asgi_request(app, "GET", "/api/resource"), requests, warmup=2000)
+        print(f"{name:8s} {results[name]['mean_us']:6.2f}us/request  p99 {results[name]['p99_us']:5.1f}us")
+    print(f"overhead {results['metrics']['mean_us'] - results['bare']['mean_us']:6.2f}us/request, {len(metrics.series())} series")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+"""Throughput of the full middleware stack, before and after the rate limiter
+became plain ASGI middleware, driven in-process over ASGI.
+
+Usage (from backend/): PYTHONPATH=. python scripts/bench_middleware.py [requests]
+
+"after" is ``app.main.app`` as it is. "before" is the same app, routes and
+middleware with the rate limiter wrapped in BaseHTTPMiddleware, as it was
+registered before: the downstream app then runs in a separate task and the
+response body is piped back through a memory stream.
+
+Requests go straight into the app one after another, so the numbers are
+framework and middleware cost without a server or network. /health runs no
+query and /api/plans is served from the in-memory plan catalog, which is
+filled with fixed plans here; no database is needed.
+"""
+import asyncio
+import os
+import sys
+
+# The limiter would otherwise start answering 429 a hundred requests in
+os.environ.setdefault("RATE_LIMIT_PER_MINUTE", "1000000000")
+os.environ.setdefault("ACCESS_LOG_ENABLED", "false")
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from benchutil import asgi_request, measure
+from app.main import app
+from app.core.plan_catalog import plan_catalog
+from app.core.rate_limiter import RateLimiterMiddleware
+from app.db.models.plan import CustomPlan
+from app.schemas.plan import PlanCreate
+
+
+class BaseHTTPRateLimiter:
+    """The same checks as RateLimiterMiddleware, as a BaseHTTPMiddleware dispatch function."""
+
+    def __init__(self, **options) -> None:
+        self.limiter = RateLimiterMiddleware(None, **options)
+
+    async def __call__(self, request, call_next):
+        if not await self.limiter.backend.hit(self.limiter.limits_for(request.scope)):
+            return JSONResponse(status_code=429, content={"error": {"code": "RATE_LIMIT_EXCEEDED", "message": "Too many requests"}})
+        return await call_next(request)
+
+
+def with_base_http_rate_limiter(app: FastAPI) -> FastAPI:
+    before = FastAPI(default_response_class=ORJSONResponse)
+    before.router = app.router
+    before.exception_handlers = app.exception_handlers
+    before.user_middleware = [
+        Middleware(BaseHTTPMiddleware, dispatch=BaseHTTPRateLimiter(**m.kwargs)) if m.cls is RateLimiterMiddleware else m
+        for m in app.user_middleware
+    ]
+    return before
+
+
+async def main() -> None:
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    plan_catalog.replace(1, [CustomPlan(id=i, **PlanCreate(name=f"Plan {i}", api_integrations=["Wolt"]).model_dump()) for i in range(1, 21)])
+    apps = {"before": with_base_http_rate_limiter(app), "after": app}
+    print(f"{'':12s} {'before':>26s} {'after':>26s}")
+    for path in ("/health", "/api/plans"):
+        columns = []
+        for target in apps.values():
+            assert await asgi_request(target, "GET", path) == 200
+            result = await measure(lambda: asgi_request(target, "GET", path), requests)
+            columns.append(f"{result['rps']:7.0f} req/s  p99 {result['p99_us']:5.0f}us")
+        print(f"{path:12s} {columns[0]:>26s} {columns[1]:>26s}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+"""Rate limiter cost per request and memory held, old vs current.
+
+Usage (from backend/): PYTHONPATH=. python scripts/bench_rate_limiter.py [requests] [clients]
+
+"before" is the per-IP timestamp list the limiter used to keep, trimmed with
+list.pop(0); "after" is SlidingWindowLimiter. Both see the same request streams over ten
+simulated minutes: a steady one where ``clients`` addresses (ten of them hot)
+keep coming back, and a churning one where every address shows up in one
+minute only, like scanners or mobile clients changing IPs. A third stream
+sends everything from one client under a 10000/min limit (a generous role
+limit), which keeps the old timestamp list at its longest.
+"""
+import random
+import sys
+import tracemalloc
+from time import perf_counter
+from app.core.rate_limiter import SlidingWindowLimiter
+
+
+class TimestampListLimiter:
+    def __init__(self, max_requests: int, window_seconds: float = 60) -> None:
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self._buckets: dict[str, list[float]] = {}
+
+    def allow(self, key: str, now: float) -> bool:
+        bucket = self._buckets.setdefault(key, [])
+        threshold = now - self.window_seconds
+        while bucket and bucket[0] < threshold:
+            bucket.pop(0)
+        if len(bucket) >= self.max_requests:
+            return False
+        bucket.append(now)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+def run(name: str, limiter, stream: list[tuple[str, float]]) -> None:
+    start = perf_counter()
+    for key, now in stream:
+        limiter.allow(key, now)
+    elapsed = perf_counter() - start
+    # Memory is measured in a second pass so tracing does not skew the timing
+    limiter = type(limiter)(limiter.max_requests, limiter.window_seconds)
+    tracemalloc.start()
+    for key, now in stream:
+        limiter.allow(key, now)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"  {name:7s} {elapsed / len(stream) * 1e6:6.2f} us/request  {len(limiter):7d} keys  {held / 2**20:7.1f} MiB held")
+
+
+def main() -> None:
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    rng = random.Random(0)
+    keys = [f"ip:10.{i // 65536}.{i // 256 % 256}.{i % 256}" for i in range(clients)]
+    weights = [50 if i < 10 else 1 for i in range(clients)]
+    steady = [(key, i * 600 / requests) for i, key in enumerate(rng.choices(keys, weights, k=requests))]
+    churn = [(f"ip:{i // 5}", i * 600 / requests) for i in range(requests)]
+
+    single = [("user:1", i * 600 / requests) for i in range(requests)]
+
+    for name, stream, limit in (("steady", steady, 100), ("churn", churn, 100), ("one client", single, 10_000)):
+        print(f"{name}: {requests} requests from {len(set(k for k, _ in stream))} clients, limit {limit}/min")
+        run("before", TimestampListLimiter(limit), stream)
+        run("after", SlidingWindowLimiter(limit), stream)
+
+    capped = SlidingWindowLimiter(100, max_keys=1000)
+    for i in range(50_000):
+        capped.allow(f"ip:{i}", 0.5)
+    print(f"cap     {len(capped)} keys tracked after 50000 distinct clients with max_keys=1000")
+
+    burst = SlidingWindowLimiter(100)
+    admitted = sum(burst.allow("ip:burst", 30 + i / 10_000) for i in range(10_000))
+    print(f"burst   {admitted} of 10000 back-to-back requests admitted")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""CPU cost of rendering one organizations list page, old vs current path.
+
+Usage (from backend/): PYTHONPATH=. python scripts/bench_serialization.py [pages]
+
+The page has 100 organizations with two branches each, built from plain
+objects so no database is involved. Three ways of turning it into a body:
+
+- before: ``model_validate`` per row, then FastAPI's ``response_model`` pass
+  (dump, re-validate, ``jsonable_encoder``) and ``JSONResponse``;
+- the same with ``ORJSONResponse`` as the response class;
+- after: ``validate_rows`` once and ``PydanticJSONResponse``, as the list
+  endpoints do now.
+
+All three must produce the same JSON.
+"""
+import asyncio
+import json
+import sys
+from datetime import date
+from time import process_time
+from types import SimpleNamespace
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from app.main import app
+from app.api.responses import PydanticJSONResponse, validate_rows
+from app.schemas.organization import OrganizationListResponse, OrganizationOut
+
+ROWS = [
+    SimpleNamespace(
+        id=i,
+        name=f"Org {i}",
+        phone=f"99890{i:07d}",
+        boss="Boss",
+        plan="Premium",
+        registrator_id=i % 7,
+        registration_date=date(2026, 1, 1),
+        plan_expiration_days=30,
+        is_active=True,
+        password=None,
+        branches=[SimpleNamespace(id=i * 10 + b, organization_id=i, name=f"Branch {b}", location="Tashkent") for b in range(2)],
+    )
+    for i in range(100)
+]
+ROUTE = next(r for r in app.routes if getattr(r, "path", "") == "/api/organizations" and "GET" in r.methods)
+
+
+async def response_model_path(response_class) -> bytes:
+    page = OrganizationListResponse(items=[OrganizationOut.model_validate(r) for r in ROWS], total=1000, page=1, size=100, next_cursor="x")
+    content = await serialize_response(field=ROUTE.response_field, response_content=page, is_coroutine=False)
+    return response_class(content).body
+
+
+async def validate_once_path() -> bytes:
+    page = OrganizationListResponse(items=validate_rows(OrganizationOut, ROWS), total=1000, page=1, size=100, next_cursor="x")
+    return PydanticJSONResponse(page).body
+
+
+async def bench(name: str, render, pages: int) -> bytes:
+    for _ in range(100):
+        await render()
+    start = process_time()
+    for _ in range(pages):
+        body = await render()
+    print(f"{name:56s} {(process_time() - start) / pages * 1e3:6.2f} ms CPU/page  ({len(body)} bytes)")
+    return body
+
+
+async def main() -> None:
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    bodies = [
+        await bench("before: model_validate + response_model + JSONResponse", lambda: response_model_path(JSONResponse), pages),
+        await bench("ORJSONResponse only", lambda: response_model_path(ORJSONResponse), pages),
+        await bench("after: validate_rows + PydanticJSONResponse", validate_once_path, pages),
+    ]
+    assert all(json.loads(body) == json.loads(bodies[0]) for body in bodies), "payloads differ"
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
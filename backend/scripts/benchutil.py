@@ -0,0 +1,55 @@
+"""Shared helpers for the in-process benchmarks in this directory."""
+from time import perf_counter
+from typing import Awaitable, Callable, Sequence
+
+
+async def asgi_request(app, method: str, path: str, headers: Sequence[tuple[bytes, bytes]] = (), client: str = "10.0.0.1") -> int:
+    """Send one request straight into an ASGI app, without a server or HTTP client; returns the status."""
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": list(headers),
+        "client": (client, 1234),
+        "server": ("bench", 80),
+    }
+    status = 0
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def measure(call: Callable[[], Awaitable], requests: int, warmup: int = 200) -> dict:
+    """Run ``call`` sequentially; returns throughput and latency percentiles."""
+    for _ in range(warmup):
+        await call()
+    latencies = []
+    start = perf_counter()
+    for _ in range(requests):
+        t = perf_counter()
+        await call()
+        latencies.append(perf_counter() - t)
+    total = perf_counter() - start
+    latencies.sort()
+    return {
+        "rps": requests / total,
+        "mean_us": total / requests * 1e6,
+        "p50_us": latencies[len(latencies) // 2] * 1e6,
+        "p99_us": latencies[int(len(latencies) * 0.99)] * 1e6,
+    }